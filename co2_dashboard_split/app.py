@@ -1,25 +1,54 @@
 
+import os
+import uuid
 import streamlit as st
 import numpy as np
 import pandas as pd
 from io import BytesIO
-from PIL import Image
-from co2dash.i18n import LANGS
+from datetime import datetime
+from co2dash.i18n import available, catalog, tr
 from co2dash.regions import REGIONAL_GRID
-from co2dash.emissions import calculate_emissions, apply_interventions
-from co2dash.recommendations import make_recommendations
-from co2dash.charts import fig_before_after, fig_breakdown, fig_sensitivity
-from co2dash.pdf_export import export_pdf
+from co2dash.emissions import apply_interventions
+from co2dash.cached import calculate_emissions, recommend, sweep_grid, monte_carlo_bands, tornado
+from co2dash.charts import fig_before_after, fig_breakdown, fig_sensitivity, fig_sensitivity_bands, fig_tornado, fig_compare
+from co2dash.optimizer import optimize_plants
+from co2dash.sensitivity import FACTORS
+from co2dash.store import upsert_plants, clear_plants, count_plants, read_plants, distinct_values
+from co2dash import instrument
+from co2dash.instrument import timed, begin, section
+
+# Reruns with unchanged inputs reuse results from the process-wide caches in co2dash.cached and co2dash.charts.
+# timed() is a no-op unless CO2DASH_PROFILE=1.
+apply_interventions = timed("apply_interventions")(apply_interventions)
+optimize_plants = timed("optimize_plants")(optimize_plants)
+fig_before_after = timed("fig_before_after")(fig_before_after)
+fig_breakdown = timed("fig_breakdown")(fig_breakdown)
+fig_sensitivity = timed("fig_sensitivity")(fig_sensitivity)
+fig_sensitivity_bands = timed("fig_sensitivity_bands")(fig_sensitivity_bands)
+fig_tornado = timed("fig_tornado")(fig_tornado)
+fig_compare = timed("fig_compare")(fig_compare)
 
 st.set_page_config(page_title="SME CO₂ Dashboard", layout="wide")
+begin("setup")
 
 # ---- Defaults ----
 DEFAULTS = dict(production=500.0, coal=200.0, electricity=100000.0, scrap_percent=20.0)
+PLANTS_PAGE_SIZE = 50
+# Optional shared render service (python -m co2dash.server); PDFs are rendered in-process when unset.
+RENDER_SERVER = os.environ.get("CO2DASH_SERVER")
 
 # Initialize defaults once
 if "initialized" not in st.session_state:
     st.session_state.update(DEFAULTS)
     st.session_state["initialized"] = True
+# Saved plants belong to a workspace: the signed-in user when auth is configured, else an id kept in the page URL
+# (?ws=...), so a reload or bookmark finds them again and users sharing the server never see or clear each other's.
+if st.user.get("is_logged_in"):
+    owner = f"user:{st.user.get('email') or st.user.get('sub')}"
+else:
+    owner = st.query_params.get("ws")
+    if not owner:
+        owner = st.query_params["ws"] = uuid.uuid4().hex
 
 # ---- Pre-widget reset (must run BEFORE any widgets are created) ----
 if st.session_state.get("reset_triggered", False):
@@ -29,8 +58,8 @@ if st.session_state.get("reset_triggered", False):
     st.rerun()
 
 # ---- Language ----
-lang = st.sidebar.selectbox("Language / भाषा", ["en", "hi"], index=0)
-T = LANGS[lang]
+lang = st.sidebar.selectbox("Language / भाषा", available(), index=0)
+T = catalog(lang)
 
 st.title(T["title"])
 st.caption(T["intro"])
@@ -64,6 +93,7 @@ with rc2:
         st.rerun()
 
 # ---- Calculations ----
+section("baseline")
 annual_production = production * 12
 annual_coal = coal * 12
 annual_electricity = electricity * 12
@@ -77,12 +107,14 @@ post_total_placeholder = m2.empty()
 reduction_placeholder = m3.empty()
 
 # ---- Charts ----
+section("charts")
 st.subheader(T["charts"])
 fig_pie = fig_breakdown(baseline["Breakdown"], T["breakdown"])
 st.plotly_chart(fig_pie, use_container_width=True)
 st.caption(T["desc_breakdown"])
 
 # ---- Actions ----
+section("actions")
 st.header(T["actions"])
 st.caption(T["actions_sub"])
 actions_desc = {
@@ -109,29 +141,31 @@ fig_bar = fig_before_after(baseline["Total CO2 (tons)"], post_total)
 st.plotly_chart(fig_bar, use_container_width=True)
 st.caption(T["desc_before_after"])
 
+with st.expander(T["optimizer"]):
+    budget = st.number_input(T["budget"], min_value=0.0, value=10.0 * annual_production, step=1000.0)
+    opt = optimize_plants(baseline["Breakdown"], annual_production, budget)
+    df_opt = pd.DataFrame({T["opt_action"]: [T[f"action_{k}"] for k in opt["actions"]],
+                           T["opt_intensity"]: (opt["intensity"][0] * 100).round(1)})
+    st.dataframe(df_opt, use_container_width=True, hide_index=True)
+    st.caption(tr(lang, "opt_result", reduction=opt["reduction"][0], cost=opt["cost"][0]))
+
 # ---- Smart recommendations ----
+section("recommendations")
 st.header(T["smart_recs"])
 st.caption(T["recs_sub"])
-tips = make_recommendations(baseline["Breakdown"])
-for tip in tips:
-    st.write("• " + tip)
-
-# Focus table
-focus_rows = []
-bk = baseline["Breakdown"]
-dom = max(bk, key=bk.get)
-if dom.startswith("Electricity"):
-    focus_rows.append((T["focus_elec"], T["dir_down"]))
-if dom.startswith("Coal"):
-    focus_rows.append((T["focus_coal"], T["dir_down"]))
-if dom.startswith("Steel-making"):
-    focus_rows.append((T["focus_process"], T["dir_down"]))
+recs = recommend(baseline["Breakdown"], production=annual_production, scrap=scrap_percent, grid_factor=elec_factor)
+for r in recs:
+    st.write("• " + r["tip"])
+
+# Focus table: one row per driver, in the order the recommendations rank them
+focus_rows = list(dict.fromkeys((T[f"focus_{d}"], T[f"dir_{dirn}"]) for d, dirn in (r["focus"] for r in recs if r["focus"])))
 if focus_rows:
     df_focus = pd.DataFrame(focus_rows, columns=[T["focus_driver"], T["focus_direction"]])
     st.subheader(T["focus_table"])
     st.dataframe(df_focus, use_container_width=True)
 
 # ---- Sensitivity ----
+section("sensitivity")
 st.header(T["sensitivity"])
 st.caption(T["sens_note"])
 s1, s2, s3, s4 = st.columns(4)
@@ -150,56 +184,106 @@ st.plotly_chart(fig_breakdown(sens_base["Breakdown"], f"{T['breakdown']} (Sensit
 st.caption(T["desc_sens_breakdown"])
 
 sweep = np.arange(-50, 51, 5)
-totals = []
-for v in sweep:
-    _elec = annual_electricity * (1 + v/100)
-    totals.append(calculate_emissions(annual_production, annual_coal, _elec, scrap_percent, factors)["Total CO2 (tons)"])
+base_inputs = dict(production=annual_production, coal=annual_coal, electricity=annual_electricity, scrap=scrap_percent)
+totals = sweep_grid(base_inputs, factors, {"electricity": sweep}).tolist()
 st.plotly_chart(fig_sensitivity(sweep, totals), use_container_width=True)
 st.caption(T["desc_sens_curve"])
 
+with st.expander(T["uncertainty"]):
+    unc = st.slider(T["unc_sd"], 0, 50, 10)
+    bands = monte_carlo_bands(base_inputs, factors, {k: unc/100 for k in FACTORS}, "electricity", sweep, n=100_000, seed=0)
+    st.plotly_chart(fig_sensitivity_bands(sweep, bands), use_container_width=True)
+    st.caption(T["desc_bands"])
+    st.subheader(T["tornado"])
+    st.plotly_chart(fig_tornado(tornado(base_inputs, factors, swing=10.0), baseline["Total CO2 (tons)"]), use_container_width=True)
+    st.caption(T["desc_tornado"])
+
 # ---- Compare ----
+section("compare")
 st.header(T["compare"])
-if "plants" not in st.session_state:
-    st.session_state.plants = {}
-pc1, pc2, pc3 = st.columns([2,1,1])
+pc1, pc2, pc3, pc4 = st.columns([2,1,1,1])
 with pc1:
     plant_name = st.text_input(T["plant_name"], "Plant A")
-if pc2.button(T["add_plant"]):
-    st.session_state.plants[plant_name] = {"Baseline": baseline["Total CO2 (tons)"], "Post": post_total}
-if pc3.button(T["clear_plants"]):
-    st.session_state.plants = {}
-if st.session_state.plants:
-    df_plants = pd.DataFrame(st.session_state.plants).T
-    st.subheader(T["plants_table"])
-    st.dataframe(df_plants, use_container_width=True)
-    df_long = df_plants.reset_index().melt(id_vars="index", var_name="Scenario", value_name="tCO2")
-    df_long.rename(columns={"index":"Plant"}, inplace=True)
-    import plotly.express as px
-    fig_cmp = px.bar(df_long, x="Plant", y="tCO2", color="Scenario", barmode="group", text="tCO2")
-    st.plotly_chart(fig_cmp, use_container_width=True)
+with pc2:
+    plant_period = st.text_input(T["period"], datetime.now().strftime("%Y"))
+if pc3.button(T["add_plant"]):
+    upsert_plants([{"name": plant_name, "region": region, "period": plant_period,
+                    "baseline": baseline["Total CO2 (tons)"], "post": post_total}], owner=owner)
+if pc4.button(T["clear_plants"]):
+    clear_plants(owner)
+fc1, fc2, fc3 = st.columns([2,2,1])
+region_filter = fc1.selectbox(T["filter_region"], [T["all"]] + distinct_values("region", owner))
+period_filter = fc2.selectbox(T["filter_period"], [T["all"]] + distinct_values("period", owner))
+region_filter = None if region_filter == T["all"] else region_filter
+period_filter = None if period_filter == T["all"] else period_filter
+n_plants = count_plants(region_filter, period_filter, owner)
+if n_plants:
+    n_pages = (n_plants - 1) // PLANTS_PAGE_SIZE + 1
+    page = fc3.number_input(T["page"], min_value=1, max_value=n_pages, value=1, step=1)
+    rows = read_plants(PLANTS_PAGE_SIZE, (page - 1) * PLANTS_PAGE_SIZE, region_filter, period_filter, owner)
+    df_plants = pd.DataFrame(rows).rename(columns={"name": "Plant", "region": T["region"], "period": T["period"],
+                                                   "baseline": "Baseline", "post": "Post"})
+    st.subheader(f"{T['plants_table']} ({n_plants})")
+    st.dataframe(df_plants, use_container_width=True, hide_index=True)
+    labels = [f"{r['name']} {r['period']}".strip() for r in rows]
+    st.plotly_chart(fig_compare(labels, [r["baseline"] for r in rows], [r["post"] for r in rows]), use_container_width=True)
 
 # ---- Export ----
+section("export")
 st.header(T["export"])
 logo_file = st.file_uploader(T["logo"], type=["png","jpg","jpeg"])
-logo_path = None
+logo_buf = None
 if logo_file:
-    logo_img = Image.open(logo_file).convert("RGBA")
-    tmp = BytesIO()
-    logo_img.save(tmp, format="PNG")
-    tmp.seek(0)
-    logo_path = "company_logo.png"
-    Image.open(tmp).save(logo_path)
+    from PIL import Image
+    logo_buf = BytesIO()
+    Image.open(logo_file).convert("RGBA").save(logo_buf, format="PNG")
+    logo_buf.seek(0)
 
 if st.button(T["download_pdf"]):
-    outfile = export_pdf(
-        filename_base="CO2_Summary",
-        baseline=baseline,
-        post_total=post_total,
-        reduction=reduction,
-        selected_actions=selected_actions,
-        logo_image=logo_path,
-        fig1=fig_before_after(baseline["Total CO2 (tons)"], post_total),
-        fig2=fig_breakdown(baseline["Breakdown"], T["breakdown"]),
-        lang_code=lang
-    )
-    st.success(f"{T['saved_msg']} ({outfile})")
+    # PDF export is rarely used, so fpdf/kaleido (and the HTTP client) load only here.
+    pdf_bytes = None
+    if RENDER_SERVER:
+        from urllib.error import URLError
+        from co2dash.server import request_pdf
+        try:
+            pdf_bytes = request_pdf(RENDER_SERVER, baseline, post_total, reduction, selected_actions,
+                                    logo_buf.getvalue() if logo_buf else None, lang)
+            outfile = f"CO2_Summary_{datetime.now().strftime('%Y-%m-%d_%H-%M')}.pdf"
+        except (URLError, OSError) as e:
+            # Server down, unreachable or failing (HTTPError is a URLError): render in this process instead.
+            st.warning(T["render_fallback"].format(error=getattr(e, "reason", e)))
+    if pdf_bytes is None:
+        from co2dash.pdf_export import export_pdf_bytes, warm_renderer
+        # One warm kaleido renderer per server process, started on first export.
+        st.cache_resource(warm_renderer)()
+        try:
+            outfile, pdf_bytes = timed("export_pdf")(export_pdf_bytes)(
+                filename_base="CO2_Summary",
+                baseline=baseline,
+                post_total=post_total,
+                reduction=reduction,
+                selected_actions=selected_actions,
+                logo_image=logo_buf,
+                fig1=fig_bar,
+                fig2=fig_pie,
+                lang_code=lang
+            )
+        except (RuntimeError, OSError) as e:
+            # e.g. kaleido finds no Chrome to render the charts with.
+            st.error(T["pdf_failed"].format(error=e))
+    if pdf_bytes is not None:
+        st.success(f"{T['saved_msg']} ({outfile})")
+        st.download_button(outfile, pdf_bytes, file_name=outfile, mime="application/pdf")
+
+section(None)
+instrument.flush()
+if instrument.ENABLED:
+    # This session's section times from this run, next to the totals across all sessions of the process.
+    st.session_state["section_times"] = instrument.last_run()
+    with st.sidebar.expander("Debug: timings"):
+        snap = instrument.snapshot()
+        spans = pd.DataFrame(snap["spans"]).T
+        spans["session_last_s"] = pd.Series({f"section.{k}": v for k, v in st.session_state["section_times"].items()})
+        st.dataframe(spans.sort_values("total_s", ascending=False), use_container_width=True)
+        st.dataframe(pd.DataFrame(snap["caches"]).T, use_container_width=True)
+        st.code(instrument.prometheus_text(), language="text")
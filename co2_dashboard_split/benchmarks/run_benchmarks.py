@@ -0,0 +1,224 @@
+"""Benchmarks for the co2dash hot paths and the dashboard rerun loop.
+
+    python benchmarks/run_benchmarks.py --out bench.json
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json      # exit 1 on regressions
+    python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+
+Results are machine-specific, so record the baseline on the machine that will run the gate.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(HERE)
+sys.path.insert(0, APP_DIR)
+
+FACTORS = {"coal_factor": 2.5, "electricity_factor": 0.00071, "process_factor": 1.8}
+DEFAULT_SIZES = (1, 1_000, 100_000, 1_000_000)
+
+def measure(fn, repeat=5, memory=False):
+    # Median wall time over repeat calls; optional peak traced allocation of one extra call.
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    out = {"seconds": statistics.median(times), "min_seconds": min(times)}
+    if memory:
+        tracemalloc.start()
+        fn()
+        out["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return out
+
+def fleet(n, seed=0):
+    import numpy as np
+    import pandas as pd
+    from co2dash.regions import REGIONAL_GRID
+    rng = np.random.default_rng(seed)
+    production = rng.uniform(100, 10_000, n)
+    return pd.DataFrame({
+        "name": [f"P{i}" for i in range(n)],
+        "production": production,
+        "coal": production * rng.uniform(0.2, 0.6, n),
+        "electricity": production * rng.uniform(300, 900, n),
+        "scrap": rng.uniform(0, 40, n),
+        "region": rng.choice(list(REGIONAL_GRID), n),
+    })
+
+def bench_scalar(results):
+    from co2dash.emissions import calculate_emissions, apply_interventions
+    from co2dash.recommendations import make_recommendations
+    calls = 2_000
+    base = calculate_emissions(6000.0, 2400.0, 1.2e6, 20.0, FACTORS)
+    r = measure(lambda: [calculate_emissions(6000.0, 2400.0, 1.2e6, 20.0, FACTORS) for _ in range(calls)])
+    results["calculate_emissions.per_call"] = {k: v / calls for k, v in r.items()}
+    r = measure(lambda: [apply_interventions(15492.0, {"scrap": 1, "eff": 1}) for _ in range(calls)])
+    results["apply_interventions.per_call"] = {k: v / calls for k, v in r.items()}
+    r = measure(lambda: [make_recommendations(base["Breakdown"]) for _ in range(calls)])
+    results["make_recommendations.per_call"] = {k: v / calls for k, v in r.items()}
+
+def bench_fleet(results, sizes):
+    import numpy as np
+    from co2dash.emissions import BREAKDOWN_KEYS, calculate_emissions_frame, apply_interventions_batch
+    from co2dash.recommendations import dominant_tips, evaluate
+    from co2dash.cli import run
+    for n in sizes:
+        df = fleet(n)
+        repeat = 3 if n >= 100_000 else 5
+        results[f"calculate_emissions_frame.n={n}"] = measure(lambda: calculate_emissions_frame(df, FACTORS), repeat, memory=True)
+        out = calculate_emissions_frame(df, FACTORS)
+        flags = np.random.default_rng(1).integers(0, 2, (n, 4))
+        results[f"apply_interventions_batch.n={n}"] = measure(lambda: apply_interventions_batch(out["Total CO2 (tons)"].to_numpy(), flags), repeat, memory=True)
+        results[f"dominant_tips.n={n}"] = measure(lambda: dominant_tips(out[list(BREAKDOWN_KEYS)]), repeat, memory=True)
+        results[f"recommend_evaluate.n={n}"] = measure(lambda: evaluate(out), repeat, memory=True)
+        results[f"cli_run.n={n}"] = measure(lambda: run(df, FACTORS, ("eff",), sweep=range(-50, 51, 5)), repeat, memory=True)
+
+def bench_charts(results):
+    from co2dash import charts
+    import numpy as np
+    bd = {"Coal 🔥": 6000.0, "Electricity ⚡": 852.0, "Steel-making ♻️": 8640.0}
+    sweep = np.arange(-50, 51, 5)
+    # __wrapped__ skips the figure cache so the builder itself is timed.
+    results["fig_breakdown.uncached"] = measure(lambda: charts._breakdown.__wrapped__(tuple(bd.items()), "Breakdown"), 10)
+    results["fig_before_after.uncached"] = measure(lambda: charts._before_after.__wrapped__(15492.0, 13942.8), 10)
+    results["fig_sensitivity.uncached"] = measure(lambda: charts._sensitivity.__wrapped__(tuple(sweep.tolist()), tuple(range(21))), 10)
+    results["fig_breakdown.cached"] = measure(lambda: charts.fig_breakdown(bd, "Breakdown"), 10)
+
+def bench_pdf(results, reports=10):
+    from io import BytesIO
+    from PIL import Image
+    from co2dash.charts import fig_before_after, fig_breakdown
+    from co2dash import pdf_export
+    bl = {"Total CO2 (tons)": 15492.0, "Breakdown": {"Coal 🔥": 6000.0, "Electricity ⚡": 852.0, "Steel-making ♻️": 8640.0}}
+    buf = BytesIO(); Image.new("RGB", (1400, 1000), "white").save(buf, format="PNG"); png = buf.getvalue()
+    r = measure(lambda: [pdf_export.build_pdf(bl, 13942.8, 1549.2, ["Use more scrap steel"], None, png, png, "en") for _ in range(reports)], 3)
+    results["build_pdf.per_report"] = {k: v / reports for k, v in r.items()}
+    # A machine without Chrome cannot render charts at all; any other error is a real failure and propagates.
+    if not pdf_export.has_browser():
+        results["export_pdf.per_report"] = {"skipped": "kaleido found no Chrome"}
+        return
+    pdf_export.warm_renderer()
+    render = pdf_export.render_png.__wrapped__
+    fig1, fig2 = fig_before_after(15492.0, 13942.8), fig_breakdown(bl["Breakdown"], "Breakdown")
+    results["export_pdf.per_report"] = measure(lambda: pdf_export.build_pdf(bl, 13942.8, 1549.2, [], None, render(fig1), render(fig2), "en"), 3)
+
+def _timed_run(args, env):
+    # Wall time of a subprocess; a crash would otherwise be recorded as a (fast) valid time, so it aborts the run.
+    t = time.perf_counter()
+    proc = subprocess.run(args, cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - t
+    if proc.returncode:
+        raise RuntimeError(f"{' '.join(args[1:])} exited with {proc.returncode}:\n{proc.stderr[-2000:]}")
+    return elapsed
+
+def bench_app(results, reruns=5):
+    # Cold start: a fresh interpreter running app.py once in Streamlit's bare mode (imports + first script run).
+    env = dict(os.environ, PYTHONWARNINGS="ignore", CO2DASH_DB=os.path.join(tempfile.mkdtemp(), "plants.db"))
+    times = [_timed_run([sys.executable, os.path.join(APP_DIR, "app.py")], env) for _ in range(3)]
+    results["app.cold_start"] = {"seconds": statistics.median(times), "min_seconds": min(times)}
+    t = _timed_run([sys.executable, "-c", "import co2dash.emissions, co2dash.regions, co2dash.recommendations"], env)
+    results["import.core"] = {"seconds": t}
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError as e:
+        results["app.rerun"] = {"skipped": str(e)}
+        return
+    os.environ["CO2DASH_DB"] = env["CO2DASH_DB"]
+    at = AppTest.from_file(os.path.join(APP_DIR, "app.py"), default_timeout=120)
+    t = time.perf_counter(); at.run(); results["app.first_run"] = {"seconds": time.perf_counter() - t}
+    times = []
+    for i in range(reruns):
+        at.checkbox[0].set_value(i % 2 == 0)
+        t = time.perf_counter(); at.run(); times.append(time.perf_counter() - t)
+    results["app.rerun.widget_change"] = {"seconds": statistics.median(times), "min_seconds": min(times)}
+    times = []
+    for i in range(reruns):
+        at.number_input(key="production").set_value(500.0 + i + 1)
+        t = time.perf_counter(); at.run(); times.append(time.perf_counter() - t)
+    results["app.rerun.input_change"] = {"seconds": statistics.median(times), "min_seconds": min(times)}
+
+def compare(results, baseline, tolerance, skipped_groups=()):
+    # Returns the "name metric" pairs that grew more than tolerance (fraction) over the baseline, plus baseline
+    # entries this run did not produce (unless their group was skipped with --skip) or produced without a
+    # metric the baseline has. Times use the best run (min_seconds, least noisy) when both sides have it; peak
+    # memory is checked the same way. Entries skipped for the environment (e.g. no Chrome) are reported only.
+    regressions = []
+    for name, base in sorted(baseline.get("results", {}).items()):
+        cur = results.get(name)
+        if cur is None:
+            if base.get("group") not in skipped_groups:
+                print(f"{name:45s} MISSING from this run")
+                regressions.append(f"{name} missing")
+            continue
+        if "skipped" in cur:
+            print(f"{name:45s} skipped: {cur['skipped']}")
+            continue
+        for metric in ("min_seconds" if "min_seconds" in base and "min_seconds" in cur else "seconds", "peak_mb"):
+            if metric not in base:
+                continue
+            if metric not in cur:
+                print(f"{name:45s} {metric:12s} MISSING from this run")
+                regressions.append(f"{name} {metric} missing")
+                continue
+            ratio = cur[metric] / base[metric] if base[metric] else float("inf")
+            flag = "REGRESSION" if ratio > 1 + tolerance else ""
+            print(f"{name:45s} {metric:12s} {base[metric]:.6f} -> {cur[metric]:.6f}  x{ratio:.2f} {flag}")
+            if flag:
+                regressions.append(f"{name} {metric}")
+    return regressions
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma-separated fleet sizes")
+    p.add_argument("--skip", default="", help="comma-separated groups to skip: scalar,fleet,charts,pdf,app")
+    p.add_argument("--out", help="write results JSON here")
+    p.add_argument("--baseline", help="compare against this results JSON and exit 1 on regressions")
+    p.add_argument("--save-baseline", help="write results JSON as the new baseline")
+    p.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown fraction before failing (default 0.25)")
+    args = p.parse_args(argv)
+    if args.baseline and not os.path.exists(args.baseline):
+        p.error(f"no baseline at {args.baseline}; run with --save-baseline first")
+
+    skip = set(filter(None, args.skip.split(",")))
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    results = {}
+    groups = {"scalar": lambda: bench_scalar(results), "fleet": lambda: bench_fleet(results, sizes),
+              "charts": lambda: bench_charts(results), "pdf": lambda: bench_pdf(results), "app": lambda: bench_app(results)}
+    for group, fn in groups.items():
+        if group not in skip:
+            print(f"running {group} ...", file=sys.stderr)
+            fn()
+            # Tag new entries with their group so a later --baseline run knows which ones --skip excused.
+            for r in results.values():
+                r.setdefault("group", group)
+    import numpy
+    report = {
+        "meta": {"timestamp": datetime.now(timezone.utc).isoformat(), "python": platform.python_version(),
+                 "platform": platform.platform(), "numpy": numpy.__version__, "cpus": os.cpu_count()},
+        "results": results,
+    }
+    for path in filter(None, (args.out, args.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+    if not args.out and not args.save_baseline:
+        json.dump(report, sys.stdout, indent=2); print()
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance, skip)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) missing or slower than baseline by more than {args.tolerance:.0%}", file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from functools import wraps
+
+def freeze(x):
+    # Hashable key for the argument types used in co2dash: dicts (order kept, it drives chart order), lists, arrays, scalars.
+    if isinstance(x, Mapping):
+        return ("__map__",) + tuple((k, freeze(v)) for k, v in x.items())
+    if isinstance(x, (list, tuple)):
+        return ("__seq__",) + tuple(freeze(v) for v in x)
+    if hasattr(x, "tobytes") and hasattr(x, "dtype"):
+        return ("__arr__", x.dtype.str, x.shape, x.tobytes())
+    return x
+
+# Every memoized function by qualified name, for instrumentation (cache hit/miss counters).
+CACHES = {}
+
+def memoize(maxsize: int = 128, key=None):
+    # LRU cache keyed on frozen args (or key(*args, **kwargs) when given), shared by every session in the process.
+    # Cached results are returned as-is, so callers must not mutate them.
+    def deco(fn):
+        store = OrderedDict()
+        lock = threading.Lock()
+        stats = {"hits": 0, "misses": 0}
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            k = key(*args, **kwargs) if key else (freeze(args), freeze(kwargs))
+            with lock:
+                if k in store:
+                    store.move_to_end(k)
+                    stats["hits"] += 1
+                    return store[k]
+                stats["misses"] += 1
+            value = fn(*args, **kwargs)
+            with lock:
+                store[k] = value
+                store.move_to_end(k)
+                while len(store) > maxsize:
+                    store.popitem(last=False)
+            return value
+
+        def cache_info():
+            with lock:
+                return dict(stats, size=len(store), maxsize=maxsize)
+
+        def cache_clear():
+            with lock:
+                store.clear()
+                stats.update(hits=0, misses=0)
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        wrapper.__wrapped__ = fn
+        CACHES[f"{fn.__module__}.{fn.__qualname__}"] = wrapper
+        return wrapper
+    return deco
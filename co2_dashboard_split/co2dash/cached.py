@@ -0,0 +1,13 @@
+from .cache import memoize
+from .instrument import timed
+from . import emissions, recommendations, sensitivity
+
+# Process-wide memoized versions of the dashboard's hot calls, shared by every rerun and session. They live in a
+# module rather than in app.py because Streamlit re-executes the script on each rerun, which would start a new,
+# empty cache every time. Callers must not mutate the results. timed() is a no-op unless CO2DASH_PROFILE=1.
+calculate_emissions = timed("calculate_emissions")(memoize(512)(emissions.calculate_emissions))
+recommend = timed("recommend")(memoize(128)(recommendations.recommend))
+sweep_grid = timed("sweep_grid")(memoize(64)(sensitivity.sweep_grid))
+# Only call with a fixed seed: an unseeded run would be cached as if it were deterministic.
+monte_carlo_bands = timed("monte_carlo_bands")(memoize(16)(sensitivity.monte_carlo_bands))
+tornado = timed("tornado")(memoize(64)(sensitivity.tornado))
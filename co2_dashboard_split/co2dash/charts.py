@@ -1,26 +1,87 @@
+import plotly.graph_objects as go
+from plotly.colors import qualitative
+from .cache import memoize
+# graph_objects only: plotly.express would also pull in pandas at import time.
+SAFE_SEQ = qualitative.Safe
+# Figures are cached on values rounded to this many decimals (hover shows .1f), so near-identical reruns reuse them.
+FIG_ROUND = 2
 
-import pandas as pd
-import plotly.express as px
-SAFE_SEQ = px.colors.qualitative.Safe
+def _r(v):
+    return round(float(v), FIG_ROUND)
 
-def fig_before_after(baseline_total, post_total):
-    df = pd.DataFrame({
-        "Scenario": ["Before", "After"],
-        "CO2 Emissions (tons)": [baseline_total, post_total]
-    })
-    fig = px.bar(df, x="Scenario", y="CO2 Emissions (tons)", text="CO2 Emissions (tons)")
+@memoize(64)
+def _before_after(baseline_total, post_total):
+    fig = go.Figure(go.Bar(x=["Before", "After"], y=[baseline_total, post_total], text=[baseline_total, post_total], textposition="auto"))
     fig.update_traces(hovertemplate="<b>%{x}</b><br>Total: %{y:.1f} t CO₂<extra></extra>")
+    fig.update_layout(xaxis_title="Scenario", yaxis_title="CO2 Emissions (tons)", margin=dict(t=60))
     return fig
 
-def fig_breakdown(breakdown_dict, title):
-    df = pd.DataFrame({"Source": list(breakdown_dict.keys()),
-                       "CO2 Emissions": list(breakdown_dict.values())})
-    fig = px.pie(df, names="Source", values="CO2 Emissions", title=title, color_discrete_sequence=SAFE_SEQ)
+def fig_before_after(baseline_total, post_total):
+    return _before_after(_r(baseline_total), _r(post_total))
+
+@memoize(64)
+def _breakdown(items, title):
+    fig = go.Figure(go.Pie(labels=[k for k, _ in items], values=[v for _, v in items]))
     fig.update_traces(hovertemplate="%{label}: %{value:.1f} t CO₂ (%{percent})<extra></extra>")
+    fig.update_layout(title=title, piecolorway=SAFE_SEQ)
+    return fig
+
+def fig_breakdown(breakdown_dict, title):
+    return _breakdown(tuple((k, _r(v)) for k, v in breakdown_dict.items()), title)
+
+def fig_compare(plants, baseline_totals, post_totals):
+    fig = go.Figure([go.Bar(name="Baseline", x=list(plants), y=list(baseline_totals), text=list(baseline_totals)),
+                     go.Bar(name="Post", x=list(plants), y=list(post_totals), text=list(post_totals))])
+    fig.update_traces(textposition="auto", texttemplate="%{y:.1f}")
+    fig.update_layout(barmode="group", xaxis_title="Plant", yaxis_title="tCO2", legend_title_text="Scenario")
     return fig
 
 def fig_sensitivity(sweep_vals, totals):
-    df = pd.DataFrame({"Change (%)": sweep_vals, "Total CO2 (tons)": totals})
-    fig = px.line(df, x="Change (%)", y="Total CO2 (tons)")
-    fig.update_traces(mode="lines+markers", hovertemplate="Δ Electricity: %{x}%<br>Total: %{y:.1f} t CO₂<extra></extra>")
+    return _sensitivity(tuple(sweep_vals.tolist() if hasattr(sweep_vals, "tolist") else sweep_vals), tuple(_r(t) for t in totals))
+
+@memoize(32)
+def _sensitivity(sweep_vals, totals):
+    fig = go.Figure(go.Scatter(x=list(sweep_vals), y=list(totals), mode="lines+markers",
+                               hovertemplate="Δ Electricity: %{x}%<br>Total: %{y:.1f} t CO₂<extra></extra>"))
+    fig.update_layout(xaxis_title="Change (%)", yaxis_title="Total CO2 (tons)", margin=dict(t=60))
+    return fig
+
+def fig_sensitivity_bands(sweep_vals, bands):
+    # bands: {percentile: totals per sweep point}, e.g. from sensitivity.monte_carlo_bands; outer pair is shaded.
+    sweep = tuple(sweep_vals.tolist() if hasattr(sweep_vals, "tolist") else sweep_vals)
+    return _sensitivity_bands(sweep, tuple((float(q), tuple(_r(t) for t in bands[q])) for q in sorted(bands)))
+
+@memoize(32)
+def _sensitivity_bands(sweep_vals, bands):
+    qs = [q for q, _ in bands]
+    lo, hi, mid = bands[0][1], bands[-1][1], bands[len(qs)//2][1]
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=list(sweep_vals), y=list(hi), mode="lines", line=dict(width=0), name=f"P{qs[-1]:g}", hoverinfo="skip"))
+    fig.add_trace(go.Scatter(x=list(sweep_vals), y=list(lo), mode="lines", line=dict(width=0), fill="tonexty",
+                             fillcolor="rgba(136,204,238,0.35)", name=f"P{qs[0]:g}–P{qs[-1]:g}", hoverinfo="skip"))
+    fig.add_trace(go.Scatter(x=list(sweep_vals), y=list(mid), mode="lines+markers", line=dict(color=SAFE_SEQ[0]), name=f"P{qs[len(qs)//2]:g}",
+                             hovertemplate="Δ Electricity: %{x}%<br>Median: %{y:.1f} t CO₂<extra></extra>"))
+    fig.update_layout(xaxis_title="Change (%)", yaxis_title="Total CO2 (tons)")
+    return fig
+
+def fig_tornado(ranking, base_total):
+    # ranking: [(name, low_total, high_total)] as returned by sensitivity.tornado, largest first.
+    return _tornado(tuple((n, _r(lo), _r(hi)) for n, lo, hi in ranking), _r(base_total))
+
+@memoize(32)
+def _tornado(ranking, base_total):
+    rows = list(reversed(ranking))
+    names = [n for n, _, _ in rows]
+    fig = go.Figure([go.Bar(name=case, y=names, x=[v[i] - base_total for v in rows], orientation="h", marker_color=color)
+                     for case, i, color in (("Low", 1, SAFE_SEQ[0]), ("High", 2, SAFE_SEQ[1]))])
+    fig.update_traces(hovertemplate="%{y}: %{x:+.1f} t CO₂<extra></extra>")
+    fig.update_layout(barmode="overlay", xaxis_title="Δ Total CO2 (tons)", yaxis_title="Variable", legend_title_text="Case")
+    return fig
+
+def fig_trend(months, rolling, plants, title=None):
+    # rolling: (plants, months) array such as MonthlyEmissions.rolling_12m(); WebGL lines keep hundreds of plants responsive.
+    fig = go.Figure([go.Scattergl(x=months, y=row, mode="lines", name=str(p),
+                                  hovertemplate=f"{p}<br>%{{x}}: %{{y:.1f}} t CO₂ (12 mo)<extra></extra>")
+                     for p, row in zip(plants, rolling)])
+    fig.update_layout(title=title, xaxis_title="Month", yaxis_title="Rolling 12-month CO2 (tons)", colorway=SAFE_SEQ)
     return fig
@@ -0,0 +1,154 @@
+import argparse
+import sys
+from .emissions import BREAKDOWN_KEYS, INTERVENTION_KEYS, calculate_emissions_batch, calculate_emissions_frame, apply_interventions_batch
+from .i18n import available
+
+# Same defaults as the dashboard's factor inputs; electricity comes from the region column when present.
+DEFAULT_FACTORS = {"coal_factor": 2.5, "electricity_factor": 0.00071, "process_factor": 1.8}
+INPUT_COLUMNS = ("production", "coal", "electricity", "scrap")
+
+def read_table(path, **kw):
+    import pandas as pd
+    if str(path).lower().endswith(".parquet"):
+        return pd.read_parquet(path, **kw)
+    return pd.read_csv(path, **kw)
+
+def write_table(df, path):
+    if str(path).lower().endswith(".parquet"):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+def sensitivity_sweep(df, factors, sweep):
+    # Total CO2 per plant (rows) for each electricity change in sweep (columns), like the dashboard curve.
+    import numpy as np
+    scale = 1 + np.asarray(sweep, dtype=float)[None, :] / 100
+    elec_factor = factors["electricity_factor"]
+    if "region" in df:
+        from .regions import grid_factors
+        elec_factor = grid_factors(df["region"], elec_factor)[:, None]
+    f = dict(factors, electricity_factor=elec_factor)
+    col = lambda c: df[c].to_numpy(dtype=float)[:, None]
+    res = calculate_emissions_batch(col("production"), col("coal"), col("electricity") * scale, col("scrap"), f)
+    return res["Total CO2 (tons)"]
+
+def run(df, factors, actions=(), monthly=True, sweep=None):
+    annual = df.copy()
+    if monthly:
+        for c in ("production", "coal", "electricity"):
+            annual[c] = df[c] * 12
+    out = calculate_emissions_frame(annual, factors).assign(**{c: df[c] for c in ("production", "coal", "electricity")})
+    flags = {k: out[f"action_{k}"].to_numpy() if f"action_{k}" in out else float(k in actions) for k in INTERVENTION_KEYS}
+    post, reduction = apply_interventions_batch(out["Total CO2 (tons)"].to_numpy(), flags)
+    out["Post CO2 (tons)"] = post
+    out["Reduction (tons)"] = reduction
+    from .recommendations import evaluate
+    # Up to three ranked tips per plant; intensity uses the annual production, grid rules the electricity factor
+    # each row was scored with (its region's, else --elec-factor).
+    elec_factor = factors["electricity_factor"]
+    if "region" in df:
+        from .regions import grid_factors
+        elec_factor = grid_factors(df["region"], elec_factor)
+    tips = evaluate(out.assign(production=annual["production"], grid_factor=elec_factor), top=3)["tips"]
+    out["Recommendation"] = tips[:, 0]
+    out["Recommendation 2"], out["Recommendation 3"] = tips[:, 1], tips[:, 2]
+    if sweep is not None and len(sweep):
+        totals = sensitivity_sweep(annual, factors, sweep)
+        for i, v in enumerate(sweep):
+            out[f"Sens elec {int(v):+d}%"] = totals[:, i]
+    return out
+
+def trend_table(series):
+    # Long table of monthly and rolling 12-month totals per plant from a MonthlyEmissions.
+    import numpy as np
+    import pandas as pd
+    n = len(series.months())
+    return pd.DataFrame({"plant": np.repeat(series.plants, n), "month": np.tile(series.months(), len(series.plants)),
+                         "Total CO2 (tons)": series.monthly().ravel(), "Rolling 12m CO2 (tons)": series.rolling_12m().ravel(),
+                         "YoY change": series.yoy().ravel()})
+
+def write_trend(series, path):
+    # .html writes the rolling 12-month chart; any other extension writes trend_table() like write_table.
+    if str(path).lower().endswith(".html"):
+        from .charts import fig_trend
+        fig_trend(series.months(), series.rolling_12m(), series.plants, title="Rolling 12-month CO2").write_html(path)
+    else:
+        write_table(trend_table(series), path)
+
+def add_portfolio(out, budget=None, fleet_budget=None, monthly=True):
+    from .optimizer import optimize_plants, optimize_fleet
+    production = out["production"].to_numpy(dtype=float) * (12 if monthly else 1)
+    breakdown = {k: out[k].to_numpy() for k in BREAKDOWN_KEYS}
+    if fleet_budget is not None:
+        opt = optimize_fleet(breakdown, production, fleet_budget)
+    else:
+        opt = optimize_plants(breakdown, production, budget)
+    out = out.assign(**{f"opt_{k}": opt["intensity"][:, i] for i, k in enumerate(opt["actions"])})
+    return out.assign(**{"Opt reduction (tons)": opt["reduction"], "Opt cost": opt["cost"]})
+
+def write_reports(out, out_dir, actions=(), lang_code="en", processes=None):
+    from .i18n import catalog
+    from .pdf_export import export_bulk
+    T = catalog(lang_code)
+    names = out["name"] if "name" in out else out["plant"] if "plant" in out else out.index
+    reports = []
+    for name, (_, row) in zip(names, out.iterrows()):
+        baseline = {"Total CO2 (tons)": row["Total CO2 (tons)"], "Breakdown": {k: row[k] for k in BREAKDOWN_KEYS}}
+        selected = [T[f"action_{k}"] for k in INTERVENTION_KEYS if (row[f"action_{k}"] if f"action_{k}" in row else k in actions)]
+        reports.append((name, baseline, row["Post CO2 (tons)"], row["Reduction (tons)"], selected))
+    return export_bulk(reports, out_dir, lang_code, processes=processes)
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m co2dash", description="Score a file of plants without the Streamlit UI.")
+    p.add_argument("input", help="CSV or Parquet with production, coal, electricity, scrap and optional name/region/action_* columns")
+    p.add_argument("output", help="CSV or Parquet output path (by extension)")
+    p.add_argument("--annual", action="store_true", help="inputs are already annual (default: monthly, scaled by 12 like the dashboard)")
+    p.add_argument("--activity", action="store_true", help="input is meter-level activity (plant, month, production/coal/electricity rows), streamed in chunks")
+    p.add_argument("--plants", help="with --activity: CSV or Parquet of plant, scrap and optional region/action_* columns")
+    p.add_argument("--trend", metavar="PATH", help="with --activity: also write monthly and rolling 12-month totals per plant (CSV/Parquet, or .html for a chart)")
+    p.add_argument("--chunksize", type=int, default=500_000, help="rows per chunk for --activity")
+    p.add_argument("--actions", default="", help=f"comma-separated interventions applied to every plant: {','.join(INTERVENTION_KEYS)}")
+    p.add_argument("--coal-factor", type=float, default=DEFAULT_FACTORS["coal_factor"])
+    p.add_argument("--elec-factor", type=float, default=DEFAULT_FACTORS["electricity_factor"], help="used for rows without a known region")
+    p.add_argument("--proc-factor", type=float, default=DEFAULT_FACTORS["process_factor"])
+    p.add_argument("--budget", type=float, help="add the best intervention mix per plant for this yearly budget (opt_* columns)")
+    p.add_argument("--fleet-budget", type=float, help="like --budget, but one budget shared across all plants")
+    p.add_argument("--reports", metavar="DIR", help="also write one PDF summary per plant into DIR")
+    p.add_argument("--lang", default="en", choices=available(), help="report language code")
+    p.add_argument("--jobs", type=int, default=None, help="worker processes for --reports (default: CPU count)")
+    p.add_argument("--sweep-step", type=int, default=5, help="electricity sensitivity step in %% (0 disables the sweep)")
+    args = p.parse_args(argv)
+
+    actions = [a.strip() for a in args.actions.split(",") if a.strip()]
+    unknown = set(actions) - set(INTERVENTION_KEYS)
+    if unknown:
+        p.error(f"unknown actions: {', '.join(sorted(unknown))}")
+    if args.trend and not args.activity:
+        p.error("--trend needs --activity (monthly rows per plant)")
+    monthly = not args.annual
+    if args.activity:
+        from .ingest import annual_activity, join_plants
+        plants = read_table(args.plants).set_index("plant") if args.plants else None
+        df = join_plants(annual_activity(args.input, chunksize=args.chunksize), plants).reset_index()
+        monthly = False
+    else:
+        df = read_table(args.input)
+    missing = [c for c in INPUT_COLUMNS if c not in df]
+    if missing:
+        p.error(f"input is missing columns: {', '.join(missing)}")
+    factors = {"coal_factor": args.coal_factor, "electricity_factor": args.elec_factor, "process_factor": args.proc_factor}
+    sweep = range(-50, 51, args.sweep_step) if args.sweep_step > 0 else None
+    out = run(df, factors, actions, monthly=monthly, sweep=sweep)
+    if args.budget is not None or args.fleet_budget is not None:
+        out = add_portfolio(out, args.budget, args.fleet_budget, monthly)
+    write_table(out, args.output)
+    print(f"Scored {len(out)} plants → {args.output}", file=sys.stderr)
+    if args.trend:
+        from .ingest import monthly_emissions
+        series = monthly_emissions(args.input, factors, plants, chunksize=args.chunksize)
+        write_trend(series, args.trend)
+        print(f"Wrote {series.n} months for {len(series.plants)} plants → {args.trend}", file=sys.stderr)
+    if args.reports:
+        paths = write_reports(out, args.reports, actions, args.lang, args.jobs)
+        print(f"Wrote {len(paths)} PDF reports → {args.reports}", file=sys.stderr)
+    return 0
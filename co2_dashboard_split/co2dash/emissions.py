@@ -1,18 +1,141 @@
+from typing import Dict, Mapping
+import numpy as np
 
-from typing import Dict
-def calculate_emissions(production_tpy: float, coal_tpy: float, electricity_kwh_py: float, scrap_percent: float, factors: Dict[str, float]) -> Dict:
-    COAL_FACTOR = factors["coal_factor"]
-    ELECTRICITY_FACTOR = factors["electricity_factor"]
-    PROCESS_FACTOR = factors["process_factor"]
+BREAKDOWN_KEYS = ("Coal 🔥", "Electricity ⚡", "Steel-making ♻️")
+INTERVENTION_RATES = {"scrap": 0.10, "heat": 0.07, "re": 0.05, "eff": 0.08}
+INTERVENTION_KEYS = tuple(INTERVENTION_RATES)
+
+def calculate_emissions_batch(production_tpy, coal_tpy, electricity_kwh_py, scrap_percent, factors: Mapping) -> Dict:
+    # Columnar version of calculate_emissions: inputs and factor values may be scalars or equal-length arrays.
+    production_tpy = np.asarray(production_tpy, dtype=float)
+    coal_tpy = np.asarray(coal_tpy, dtype=float)
+    electricity_kwh_py = np.asarray(electricity_kwh_py, dtype=float)
+    scrap_percent = np.asarray(scrap_percent, dtype=float)
+    COAL_FACTOR = np.asarray(factors["coal_factor"], dtype=float)
+    ELECTRICITY_FACTOR = np.asarray(factors["electricity_factor"], dtype=float)
+    PROCESS_FACTOR = np.asarray(factors["process_factor"], dtype=float)
     process_emissions = production_tpy * PROCESS_FACTOR * (1 - scrap_percent/100)
     coal_emissions = coal_tpy * COAL_FACTOR
     electricity_emissions = electricity_kwh_py * ELECTRICITY_FACTOR
     total = coal_emissions + electricity_emissions + process_emissions
     return {
-        "Total CO2 (tons)": float(total),
-        "Breakdown": {"Coal 🔥": float(coal_emissions), "Electricity ⚡": float(electricity_emissions), "Steel-making ♻️": float(process_emissions)}
+        "Total CO2 (tons)": total,
+        "Breakdown": dict(zip(BREAKDOWN_KEYS, (coal_emissions, electricity_emissions, process_emissions)))
     }
-def apply_interventions(baseline_total: float, interventions_flags: Dict[str, int]):
-    reduction_frac = (0.10 * interventions_flags.get("scrap", 0) + 0.07 * interventions_flags.get("heat", 0) + 0.05 * interventions_flags.get("re", 0) + 0.08 * interventions_flags.get("eff", 0))
+
+def calculate_emissions(production_tpy: float, coal_tpy: float, electricity_kwh_py: float, scrap_percent: float, factors: Dict[str, float]) -> Dict:
+    res = calculate_emissions_batch(production_tpy, coal_tpy, electricity_kwh_py, scrap_percent, factors)
+    return {
+        "Total CO2 (tons)": float(res["Total CO2 (tons)"]),
+        "Breakdown": {k: float(v) for k, v in res["Breakdown"].items()}
+    }
+
+def calculate_emissions_frame(df, factors: Mapping, region_grid: Mapping = None):
+    # df needs production/coal/electricity/scrap columns (annual quantities); an optional region column
+    # overrides factors["electricity_factor"] per row via region_grid (defaults to REGIONAL_GRID).
+    elec_factor = factors["electricity_factor"]
+    if "region" in df:
+        from .regions import grid_factors
+        elec_factor = grid_factors(df["region"], elec_factor, region_grid)
+    f = dict(factors, electricity_factor=elec_factor)
+    res = calculate_emissions_batch(df["production"].to_numpy(), df["coal"].to_numpy(),
+                                    df["electricity"].to_numpy(), df["scrap"].to_numpy(), f)
+    return df.assign(**res["Breakdown"], **{"Total CO2 (tons)": res["Total CO2 (tons)"]})
+
+def apply_interventions_batch(baseline_total, interventions_flags):
+    # interventions_flags: mapping of flag name -> 0/1 array, or an (n, 4) matrix with columns in INTERVENTION_KEYS order.
+    baseline_total = np.asarray(baseline_total, dtype=float)
+    if isinstance(interventions_flags, Mapping):
+        cols = [np.asarray(interventions_flags.get(k, 0), dtype=float) for k in INTERVENTION_KEYS]
+    else:
+        m = np.asarray(interventions_flags, dtype=float)
+        cols = [m[..., i] for i in range(len(INTERVENTION_KEYS))]
+    reduction_frac = 0.0
+    for k, col in zip(INTERVENTION_KEYS, cols):
+        reduction_frac = reduction_frac + INTERVENTION_RATES[k] * col
     reduction = baseline_total * reduction_frac
-    return max(baseline_total - reduction, 0.0), reduction
+    return np.maximum(baseline_total - reduction, 0.0), reduction
+
+def apply_interventions(baseline_total: float, interventions_flags: Dict[str, int]):
+    post, reduction = apply_interventions_batch(baseline_total, interventions_flags)
+    return float(post), float(reduction)
+
+def _month_index(month) -> int:
+    # "YYYY-MM" (or anything with .year/.month) -> months since year 0.
+    if hasattr(month, "year"):
+        return month.year * 12 + month.month - 1
+    y, m = str(month)[:7].split("-")
+    return int(y) * 12 + int(m) - 1
+
+class MonthlyEmissions:
+    # Monthly emissions for a fixed set of plants, stored as (plants, months) arrays that grow in place.
+    # Appending a month computes only that month and updates the rolling 12-month sums from the last 12 columns,
+    # so the cost of an update does not depend on how much history is already loaded.
+    SERIES = ("Total CO2 (tons)",) + BREAKDOWN_KEYS
+
+    def __init__(self, plants, factors: Mapping, start, capacity: int = 24):
+        self.plants = list(plants)
+        # Per-plant factor arrays become columns so they broadcast across months.
+        self.factors = {k: np.asarray(v, dtype=float).reshape(-1, 1) if np.ndim(v) else v for k, v in factors.items()}
+        self.start = _month_index(start)
+        self.n = 0
+        shape = (len(self.plants), max(int(capacity), 1))
+        self._monthly = {k: np.zeros(shape) for k in self.SERIES}
+        self._rolling = {k: np.zeros(shape) for k in self.SERIES}
+
+    def _reserve(self, months: int):
+        cap = self._monthly[self.SERIES[0]].shape[1]
+        if self.n + months <= cap:
+            return
+        cap = max(cap * 2, self.n + months)
+        for bufs in (self._monthly, self._rolling):
+            for k, a in bufs.items():
+                grown = np.zeros((a.shape[0], cap))
+                grown[:, :self.n] = a[:, :self.n]
+                bufs[k] = grown
+
+    def extend(self, production, coal, electricity, scrap_percent):
+        # Append one or more months; inputs are per-plant monthly quantities shaped (plants,) or (plants, months).
+        inputs = [np.asarray(x, dtype=float) for x in (production, coal, electricity, scrap_percent)]
+        inputs = [x.reshape(len(self.plants), -1) if x.ndim else x for x in inputs]
+        months = max([x.shape[1] for x in inputs if x.ndim] or [1])
+        res = calculate_emissions_batch(*inputs, self.factors)
+        new = {"Total CO2 (tons)": res["Total CO2 (tons)"], **res["Breakdown"]}
+        self._reserve(months)
+        lo, hi = self.n, self.n + months
+        first = max(lo - 11, 0)
+        for k in self.SERIES:
+            m = self._monthly[k]
+            m[:, lo:hi] = new[k]
+            # Rolling sums for the new months only, from a cumsum starting 11 months before the first of them.
+            c = np.cumsum(m[:, first:hi], axis=1)
+            c[:, 12:] = c[:, 12:] - c[:, :-12].copy()
+            self._rolling[k][:, lo:hi] = c[:, lo - first:]
+        self.n = hi
+        return self
+
+    append = extend
+
+    def monthly(self, key: str = "Total CO2 (tons)") -> np.ndarray:
+        return self._monthly[key][:, :self.n]
+
+    def rolling_12m(self, key: str = "Total CO2 (tons)") -> np.ndarray:
+        # Trailing 12-month sums; the first 11 months hold partial-year sums.
+        return self._rolling[key][:, :self.n]
+
+    def breakdown(self, month: int = -1) -> Dict[str, np.ndarray]:
+        # Rolling 12-month breakdown per plant at a given month (default: latest).
+        return {k: self._rolling[k][:, :self.n][:, month] for k in BREAKDOWN_KEYS}
+
+    def yoy(self, key: str = "Total CO2 (tons)") -> np.ndarray:
+        # Year-over-year change (fraction) of the rolling 12-month sum; NaN until 24 months are loaded.
+        r = self.rolling_12m(key)
+        out = np.full(r.shape, np.nan)
+        if self.n > 23:
+            prev = r[:, 11:-12]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                out[:, 23:] = r[:, 23:] / prev - 1
+        return out
+
+    def months(self):
+        return [f"{i // 12}-{i % 12 + 1:02d}" for i in range(self.start, self.start + self.n)]
@@ -1,139 +1,77 @@
+import json
+import os
+from collections.abc import Mapping
+from string import Formatter
+from types import MappingProxyType
+from .cache import memoize
 
-LANGS = {
-    "en": {
-        "title": "SME CO₂ Emission Reduction Dashboard",
-        "intro": "Enter plant data, view impact, then pick actions. Compare plants and export a branded report.",
-        "plant_data": "Enter Your Plant Data",
-        "prod": "Monthly Steel Production (tons)",
-        "coal": "Monthly Coal Consumption (tons)",
-        "elec": "Monthly Electricity Usage (kWh)",
-        "scrap": "Scrap Steel Usage (%)",
-        "region": "Electricity Grid Region",
-        "override_factors": "Override emission factors",
-        "coal_factor": "Coal factor (tCO₂/ton coal)",
-        "elec_factor": "Electricity factor (tCO₂/kWh)",
-        "proc_factor": "Process factor (tCO₂/ton steel)",
-        "actions": "Recommended Actions (you choose)",
-        "actions_sub": "Pick interventions to simulate changes. These are manual choices you plan to implement.",
-        "action_scrap": "Use more scrap steel",
-        "action_heat": "Recover wasted heat",
-        "action_re": "Add small renewable energy",
-        "action_eff": "Improve energy efficiency",
-        "desc_scrap": "Increase scrap usage to reduce steel-making emissions.",
-        "desc_heat": "Implement heat recovery to save energy and CO₂.",
-        "desc_re": "Add solar/wind to partially replace grid electricity.",
-        "desc_eff": "Minor upgrades to reduce energy consumption.",
-        "summary": "Your CO₂ Summary",
-        "baseline": "Baseline CO₂",
-        "post": "Post-action CO₂",
-        "reduction": "Potential Reduction",
-        "charts": "Emissions Charts",
-        "breakdown": "Baseline CO₂ Breakdown",
-        "desc_before_after": "Hover to compare baseline vs post-action totals. Lower is better.",
-        "desc_breakdown": "Hover to see how much each source contributes. Focus on the largest slice first.",
-        "sensitivity": "Sensitivity Analysis",
-        "sens_note": "Change drivers and test whether recommendations work.",
-        "sens_prod": "Δ Production (%)",
-        "sens_coal": "Δ Coal (%)",
-        "sens_elec": "Δ Electricity (%)",
-        "sens_scrap": "Δ Scrap (pp)",
-        "desc_sens_breakdown": "This breakdown updates as you adjust the sliders—use it to see which lever reduces CO₂ most.",
-        "desc_sens_curve": "This curve shows total CO₂ change as electricity usage varies. Hover to read exact values.",
-        "smart_recs": "Smart Recommendations (auto analysis)",
-        "recs_sub": "Data-driven guidance based on your baseline mix. Use these to decide which actions to pick above.",
-        "focus_table": "What to decrease / focus",
-        "focus_driver": "Driver",
-        "focus_direction": "Suggested change",
-        "focus_elec": "Electricity usage",
-        "focus_coal": "Coal usage",
-        "focus_process": "Steel-making intensity",
-        "dir_down": "Decrease",
-        "dir_up": "Increase",
-        "compare": "Multi-Plant Comparison",
-        "plant_name": "Plant name",
-        "add_plant": "Add/Update plant",
-        "clear_plants": "Clear all",
-        "plants_table": "Saved plants",
-        "export": "Export Summary",
-        "logo": "Company logo (PNG/JPG, optional)",
-        "download_pdf": "Download PDF Summary",
-        "saved_msg": "PDF generated.",
-        "lang": "Language",
-        "reset": "Reset inputs",
-        "pdf_generated": "Generated",
-        "pdf_selected_actions": "Selected Actions",
-        "pdf_before_after": "Emissions (Before vs After)",
-        "pdf_baseline_breakdown": "Baseline Breakdown",
-        "pdf_baseline": "Baseline CO2",
-        "pdf_post": "Post-action CO2",
-        "pdf_reduction": "Potential Reduction",
-    },
-    "hi": {
-        "title": "एसएमई CO₂ कमी डैशबोर्ड",
-        "intro": "प्लांट डेटा भरें, प्रभाव देखें, फिर कार्रवाइयाँ चुनें। प्लांट तुलना करें और ब्रांडेड रिपोर्ट निर्यात करें।",
-        "plant_data": "अपने प्लांट का डेटा दर्ज करें",
-        "prod": "मासिक स्टील उत्पादन (टन)",
-        "coal": "मासिक कोयला खपत (टन)",
-        "elec": "मासिक बिजली उपयोग (kWh)",
-        "scrap": "स्क्रैप स्टील (%)",
-        "region": "बिजली ग्रिड क्षेत्र",
-        "override_factors": "उत्सर्जन फ़ैक्टर बदलें",
-        "coal_factor": "कोयला फ़ैक्टर (tCO₂/टन)",
-        "elec_factor": "बिजली फ़ैक्टर (tCO₂/kWh)",
-        "proc_factor": "प्रक्रिया फ़ैक्टर (tCO₂/टन स्टील)",
-        "actions": "अनुशंसित कार्रवाइयाँ (आप चुनें)",
-        "actions_sub": "ये हस्तक्षेप आप स्वयं लागू करेंगे—यहाँ चुनकर परिणाम देखें।",
-        "action_scrap": "अधिक स्क्रैप स्टील",
-        "action_heat": "बेकार ऊष्मा पुनर्प्राप्ति",
-        "action_re": "नवीकरणीय ऊर्जा जोड़ें",
-        "action_eff": "ऊर्जा दक्षता सुधारें",
-        "desc_scrap": "स्टील-निर्माण उत्सर्जन घटाने हेतु स्क्रैप बढ़ाएँ।",
-        "desc_heat": "ऊष्मा पुनर्प्राप्ति से ऊर्जा/CO₂ बचत।",
-        "desc_re": "ग्रिड बिजली के हिस्से को सौर/पवन से बदलें।",
-        "desc_eff": "छोटे अपग्रेड से खपत घटाएँ।",
-        "summary": "आपका CO₂ सारांश",
-        "baseline": "आधार CO₂",
-        "post": "कार्रवाई के बाद CO₂",
-        "reduction": "संभावित कमी",
-        "charts": "उत्सर्जन चार्ट",
-        "breakdown": "आधार CO₂ ब्रेकडाउन",
-        "desc_before_after": "हॉवर करके आधार और कार्रवाई के बाद के कुल उत्सर्जन देखें। जितना कम, उतना बेहतर।",
-        "desc_breakdown": "हॉवर करके प्रत्येक स्रोत का योगदान देखें। सबसे बड़े हिस्से पर पहले ध्यान दें।",
-        "sensitivity": "संवेदनशीलता विश्लेषण",
-        "sens_note": "ड्राइवर बदलें और देखें सिफ़ारिशें काम करती हैं या नहीं।",
-        "sens_prod": "उत्पादन परिवर्तन (%)",
-        "sens_coal": "कोयला परिवर्तन (%)",
-        "sens_elec": "बिजली परिवर्तन (%)",
-        "sens_scrap": "स्क्रैप परिवर्तन (pp)",
-        "desc_sens_breakdown": "स्लाइडर बदलते ही यह ब्रेकडाउन अपडेट होता है—कौन-सा लीवर CO₂ सबसे ज़्यादा घटाता है, देखें।",
-        "desc_sens_curve": "यह कर्व बिजली उपयोग बदलने पर कुल CO₂ का असर दिखाता है। हॉवर करके सटीक मान देखें।",
-        "smart_recs": "स्मार्ट सिफ़ारिशें (स्वचालित विश्लेषण)",
-        "recs_sub": "आपके आधार मिश्रण पर आधारित डेटा-निर्देशित सलाह। इन्हें ऊपर की कार्रवाइयाँ चुनने में आधार बनाएं।",
-        "focus_table": "किसे घटाएँ / फोकस",
-        "focus_driver": "ड्राइवर",
-        "focus_direction": "सुझावित बदलाव",
-        "focus_elec": "बिजली उपयोग",
-        "focus_coal": "कोयला उपयोग",
-        "focus_process": "स्टील-निर्माण तीव्रता",
-        "dir_down": "घटाएँ",
-        "dir_up": "बढ़ाएँ",
-        "compare": "मल्टी-प्लांट तुलना",
-        "plant_name": "प्लांट का नाम",
-        "add_plant": "प्लांट जोड़ें/अपडेट करें",
-        "clear_plants": "सभी साफ़ करें",
-        "plants_table": "सहेजे गए प्लांट",
-        "export": "सारांश निर्यात",
-        "logo": "कंपनी लोगो (PNG/JPG, वैकल्पिक)",
-        "download_pdf": "PDF सारांश डाउनलोड करें",
-        "saved_msg": "PDF तैयार।",
-        "lang": "भाषा",
-        "reset": "इनपुट रीसेट करें",
-        "pdf_generated": "जनरेट किया गया",
-        "pdf_selected_actions": "चयनित कार्रवाइयाँ",
-        "pdf_before_after": "उत्सर्जन (पहले बनाम बाद)",
-        "pdf_baseline_breakdown": "आधार ब्रेकडाउन",
-        "pdf_baseline": "आधार CO2",
-        "pdf_post": "कार्रवाई के बाद CO2",
-        "pdf_reduction": "संभावित कमी",
-    }
-}
+# UI strings live in one JSON catalog per language, locales/<code>.json. A catalog is read and compiled the first
+# time its language is used (and the cache keeps only a few), so start-up and memory don't grow with the
+# languages shipped. Keys a catalog lacks, or whose {placeholders} don't match English, fall back to English.
+LOCALE_DIR = os.path.join(os.path.dirname(__file__), "locales")
+DEFAULT_LANG = "en"
+
+# Common non-latin-1 characters with a close latin-1 spelling for fpdf's core fonts.
+_PDF_SUBST = str.maketrans({"₂": "2", "—": "-", "–": "-", "‘": "'", "’": "'", "“": '"', "”": '"', "…": "..."})
+
+@memoize(1)
+def available():
+    # Shipped language codes, English first; only lists file names.
+    codes = sorted(f[:-5] for f in os.listdir(LOCALE_DIR) if f.endswith(".json"))
+    return tuple(sorted(codes, key=lambda c: c != DEFAULT_LANG))
+
+def _fields(text):
+    return {name for _, name, _, _ in Formatter().parse(text) if name is not None}
+
+@memoize(8)
+def catalog(code: str) -> Mapping:
+    # Read-only key -> text mapping for one language.
+    if code not in available():
+        raise KeyError(f"unknown language: {code}")
+    with open(os.path.join(LOCALE_DIR, f"{code}.json"), encoding="utf-8") as f:
+        own = json.load(f)
+    if code == DEFAULT_LANG:
+        return MappingProxyType(own)
+    base = catalog(DEFAULT_LANG)
+    return MappingProxyType({k: own[k] if k in own and _fields(own[k]) == _fields(v) else v for k, v in base.items()})
+
+def tr(code: str, key: str, **kwargs) -> str:
+    text = catalog(code)[key]
+    return text.format(**kwargs) if kwargs else text
+
+def latin1(text) -> str:
+    # Core PDF fonts are latin-1 only; characters without a substitute are dropped.
+    return str(text).translate(_PDF_SUBST).encode("latin-1", "ignore").decode("latin-1")
+
+@memoize(8)
+def pdf_catalog(code: str) -> Mapping:
+    # catalog(code) encoded for the PDF once per language. Entries that would lose characters (Devanagari, Tamil,
+    # Bengali, ...) use the English text instead of printing blank or half a word.
+    en = None if code == DEFAULT_LANG else pdf_catalog(DEFAULT_LANG)
+    out = {}
+    for k, v in catalog(code).items():
+        s = v.translate(_PDF_SUBST)
+        safe = s.encode("latin-1", "ignore").decode("latin-1")
+        out[k] = safe if en is None or safe == s else en[k]
+    return MappingProxyType(out)
+
+@memoize(8)
+def _pdf_by_text(code):
+    return {v: pdf_catalog(code)[k] for k, v in catalog(code).items()}
+
+def pdf_text(code: str, text) -> str:
+    # PDF-safe form of an already translated string (e.g. a selected action label); other text is just encoded.
+    return _pdf_by_text(code).get(text) or latin1(text)
+
+class _Catalogs(Mapping):
+    # LANGS[code] -> catalog(code), loading on first access.
+    def __getitem__(self, code):
+        return catalog(code)
+
+    def __iter__(self):
+        return iter(available())
+
+    def __len__(self):
+        return len(available())
+
+LANGS = _Catalogs()
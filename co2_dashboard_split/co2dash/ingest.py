@@ -0,0 +1,96 @@
+import pandas as pd
+from .emissions import calculate_emissions_frame
+
+QUANTITY_COLUMNS = ("production", "coal", "electricity")
+DEFAULT_CHUNKSIZE = 500_000
+
+def read_chunks(path, columns=None, chunksize: int = DEFAULT_CHUNKSIZE):
+    # Yields DataFrames of at most chunksize rows so the whole file is never held in memory.
+    if str(path).lower().endswith(".parquet"):
+        import pyarrow.parquet as pq
+        pf = pq.ParquetFile(path)
+        if columns is not None:
+            columns = [c for c in columns if c in pf.schema_arrow.names]
+        for batch in pf.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    else:
+        usecols = None if columns is None else (lambda c: c in columns)
+        yield from pd.read_csv(path, usecols=usecols, chunksize=chunksize)
+
+def iter_annual_activity(chunks, plant_col="plant", period_col="month", annualize=True):
+    # Running per-plant totals over activity chunks; with a period column, totals are scaled to 12 months
+    # (the dashboard's monthly * 12) using the number of distinct months seen for each plant.
+    # State is one row per plant plus one per (plant, month), independent of the number of input rows.
+    totals = pd.DataFrame(columns=list(QUANTITY_COLUMNS), dtype=float)
+    periods = None
+    for chunk in chunks:
+        for c in QUANTITY_COLUMNS:
+            if c not in chunk:
+                chunk[c] = 0.0
+        part = chunk.groupby(plant_col)[list(QUANTITY_COLUMNS)].sum()
+        totals = part if totals.empty else totals.add(part, fill_value=0.0)
+        if period_col in chunk:
+            when = pd.to_datetime(chunk[period_col])
+            seen = pd.DataFrame({plant_col: chunk[plant_col], period_col: when.dt.year * 12 + when.dt.month}).drop_duplicates()
+            periods = seen if periods is None else pd.concat([periods, seen], ignore_index=True)
+            periods = periods.drop_duplicates(ignore_index=True)
+        annual = totals
+        if annualize and periods is not None:
+            months = periods.groupby(plant_col).size().reindex(totals.index).fillna(12)
+            annual = totals.mul(12 / months, axis=0)
+        yield annual.rename_axis(plant_col)
+
+def annual_activity(path, plant_col="plant", period_col="month", annualize=True, chunksize: int = DEFAULT_CHUNKSIZE):
+    annual = None
+    chunks = read_chunks(path, [plant_col, period_col, *QUANTITY_COLUMNS], chunksize)
+    for annual in iter_annual_activity(chunks, plant_col, period_col, annualize):
+        pass
+    return annual
+
+def join_plants(annual, plants=None, scrap_percent: float = 0.0):
+    # plants: optional DataFrame indexed by plant with scrap (and region) columns.
+    df = annual if plants is None else annual.join(plants, how="left")
+    if "scrap" not in df:
+        df = df.assign(scrap=scrap_percent)
+    return df.fillna({"scrap": scrap_percent})
+
+def stream_emissions(path, factors, plants=None, scrap_percent: float = 0.0, plant_col="plant", period_col="month",
+                     annualize=True, chunksize: int = DEFAULT_CHUNKSIZE):
+    # Yields per-plant annual emissions after each chunk, so callers can report progress or stop early.
+    chunks = read_chunks(path, [plant_col, period_col, *QUANTITY_COLUMNS], chunksize)
+    for annual in iter_annual_activity(chunks, plant_col, period_col, annualize):
+        yield calculate_emissions_frame(join_plants(annual, plants, scrap_percent), factors)
+
+def monthly_activity(chunks, plant_col="plant", period_col="month"):
+    # Per-(plant, month) totals over activity chunks as a (plant, month index) frame; months are months since year 0.
+    totals = None
+    for chunk in chunks:
+        for c in QUANTITY_COLUMNS:
+            if c not in chunk:
+                chunk[c] = 0.0
+        when = pd.to_datetime(chunk[period_col])
+        part = chunk.assign(**{period_col: when.dt.year * 12 + when.dt.month - 1})
+        part = part.groupby([plant_col, period_col])[list(QUANTITY_COLUMNS)].sum()
+        totals = part if totals is None else totals.add(part, fill_value=0.0)
+    return totals
+
+def monthly_emissions(path, factors, plants=None, scrap_percent: float = 0.0, plant_col="plant", period_col="month",
+                      chunksize: int = DEFAULT_CHUNKSIZE):
+    # MonthlyEmissions for every plant in an activity file, from its first to its last month (gaps count as zero).
+    # plants: optional DataFrame indexed by plant with scrap and region columns, as for stream_emissions.
+    from .emissions import MonthlyEmissions
+    totals = monthly_activity(read_chunks(path, [plant_col, period_col, *QUANTITY_COLUMNS], chunksize), plant_col, period_col)
+    if totals is None:
+        raise ValueError(f"{path}: no activity rows")
+    first, last = totals.index.get_level_values(period_col).min(), totals.index.get_level_values(period_col).max()
+    wide = {c: totals[c].unstack(period_col, fill_value=0.0).reindex(columns=range(first, last + 1), fill_value=0.0)
+            for c in QUANTITY_COLUMNS}
+    info = join_plants(pd.DataFrame(index=wide["production"].index), plants, scrap_percent)
+    elec_factor = factors["electricity_factor"]
+    if "region" in info:
+        from .regions import grid_factors
+        elec_factor = grid_factors(info["region"], elec_factor)
+    series = MonthlyEmissions(info.index, dict(factors, electricity_factor=elec_factor),
+                              f"{first // 12}-{first % 12 + 1:02d}", capacity=last - first + 1)
+    scrap = info["scrap"].to_numpy(dtype=float)[:, None]
+    return series.extend(*(wide[c].to_numpy() for c in QUANTITY_COLUMNS), scrap)
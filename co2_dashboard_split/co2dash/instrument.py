@@ -0,0 +1,119 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+# Opt-in timing for dashboard sections and co2dash calls. Set CO2DASH_PROFILE=1 before start-up; when off,
+# timed() returns functions unwrapped and span()/section() do nothing, so the overhead is a flag check.
+ENABLED = os.environ.get("CO2DASH_PROFILE", "").lower() in ("1", "true", "yes")
+METRICS_FILE = os.environ.get("CO2DASH_METRICS_FILE")
+
+_lock = threading.Lock()
+_stats = {}  # name -> [calls, total seconds, max seconds, last seconds]
+_local = threading.local()
+_NULL = nullcontext()
+log = logging.getLogger("co2dash.instrument")
+
+def enable(on: bool = True):
+    global ENABLED
+    ENABLED = on
+
+def record(name: str, seconds: float):
+    with _lock:
+        s = _stats.get(name)
+        if s is None:
+            _stats[name] = [1, seconds, seconds, seconds]
+        else:
+            s[0] += 1; s[1] += seconds; s[3] = seconds
+            if seconds > s[2]: s[2] = seconds
+
+@contextmanager
+def _span(name):
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - t)
+
+def span(name: str):
+    return _span(name) if ENABLED else _NULL
+
+def timed(name: str = None):
+    def deco(fn):
+        if not ENABLED:
+            return fn
+        label = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            t = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(label, time.perf_counter() - t)
+        return wrapper
+    return deco
+
+def section(name: str = None):
+    # Sequential page sections: closes the running section of this thread and starts `name` (None just closes).
+    if not ENABLED:
+        return
+    now = time.perf_counter()
+    prev = getattr(_local, "section", None)
+    if prev is not None:
+        record(f"section.{prev[0]}", now - prev[1])
+        if not hasattr(_local, "run"):
+            _local.run = {}
+        _local.run[prev[0]] = _local.run.get(prev[0], 0.0) + now - prev[1]
+    _local.section = (name, now) if name else None
+
+def begin(name: str):
+    # Start of a script run: drop any section left open by an interrupted run (e.g. st.rerun()) and open `name`.
+    if ENABLED:
+        _local.run = {}
+        _local.section = (name, time.perf_counter())
+
+def last_run() -> dict:
+    # Section -> seconds for this thread's current script run (since begin()), unlike the process-wide snapshot().
+    return dict(getattr(_local, "run", {}))
+
+def snapshot() -> dict:
+    from .cache import CACHES
+    with _lock:
+        spans = {k: {"calls": v[0], "total_s": v[1], "max_s": v[2], "last_s": v[3]} for k, v in _stats.items()}
+    return {"spans": spans, "caches": {k: fn.cache_info() for k, fn in CACHES.items()}}
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+def prometheus_text() -> str:
+    # Text exposition format: each metric family is one block, its TYPE line followed by all of its samples.
+    snap = snapshot()
+    families = [("co2dash_span_seconds_total", "counter", "name", "spans", "total_s", "{:.6f}"),
+                ("co2dash_span_calls_total", "counter", "name", "spans", "calls", "{}"),
+                ("co2dash_span_seconds_max", "gauge", "name", "spans", "max_s", "{:.6f}"),
+                ("co2dash_span_seconds_last", "gauge", "name", "spans", "last_s", "{:.6f}"),
+                ("co2dash_cache_hits_total", "counter", "cache", "caches", "hits", "{}"),
+                ("co2dash_cache_misses_total", "counter", "cache", "caches", "misses", "{}"),
+                ("co2dash_cache_size", "gauge", "cache", "caches", "size", "{}")]
+    lines = []
+    for metric, kind, label, group, field, fmt in families:
+        lines.append(f"# TYPE {metric} {kind}")
+        lines += [f'{metric}{{{label}="{k}"}} {fmt.format(v[field])}' for k, v in sorted(snap[group].items())]
+    return "\n".join(lines) + "\n"
+
+def flush():
+    # Once per rerun: log a JSON snapshot and, if CO2DASH_METRICS_FILE is set, rewrite it for a textfile scraper.
+    if not ENABLED:
+        return
+    log.info(json.dumps(snapshot()))
+    if METRICS_FILE:
+        # Sessions run on separate threads, so the temp name must be unique per thread, not just per process.
+        tmp = f"{METRICS_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(prometheus_text())
+        os.replace(tmp, METRICS_FILE)
@@ -0,0 +1,90 @@
+from itertools import product
+from typing import Dict, Mapping
+import numpy as np
+from .emissions import BREAKDOWN_KEYS
+
+# Marginal-abatement model: at intensity x in [0, 1] an action cuts each listed Breakdown source by effect * x
+# and costs cost * x * annual steel production (currency per t steel at full intensity). Effects on one source
+# add up, so the per-source sums must stay <= 1. Costs are illustrative defaults; pass site data where known.
+DEFAULT_ACTIONS = {
+    "scrap": {"cost": 15.0, "effects": {"Steel-making ♻️": 0.30}},
+    "heat": {"cost": 8.0, "effects": {"Coal 🔥": 0.15}},
+    "re": {"cost": 12.0, "effects": {"Electricity ⚡": 0.40}},
+    "eff": {"cost": 5.0, "effects": {"Coal 🔥": 0.08, "Electricity ⚡": 0.12}},
+}
+
+def action_matrices(breakdown: Mapping, production_tpy, actions: Mapping = DEFAULT_ACTIONS):
+    # Full-intensity abatement (t CO2) and cost per plant and action, both shaped (plants, actions).
+    production_tpy = np.atleast_1d(np.asarray(production_tpy, dtype=float))
+    src = {k: np.broadcast_to(np.atleast_1d(np.asarray(breakdown[k], dtype=float)), production_tpy.shape) for k in BREAKDOWN_KEYS}
+    gain = np.stack([sum(e * src[s] for s, e in a["effects"].items()) for a in actions.values()], axis=1)
+    cost = np.stack([a["cost"] * production_tpy for a in actions.values()], axis=1)
+    return gain, cost
+
+def _result(actions, x, gain, cost, breakdown):
+    total = sum(np.atleast_1d(np.asarray(breakdown[k], dtype=float)) for k in BREAKDOWN_KEYS)
+    reduction = (x * gain).sum(axis=1)
+    return {"actions": tuple(actions), "intensity": x, "reduction": reduction, "cost": (x * cost).sum(axis=1),
+            "post": total - reduction}
+
+def _fill(ratio_order, gain, cost, budget):
+    # Fractional knapsack along the last axis: take items in order until the budget runs out.
+    c = np.take_along_axis(cost, ratio_order, axis=-1)
+    spent_before = np.cumsum(c, axis=-1) - c
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_sorted = np.where(c > 0, np.clip((np.expand_dims(budget, -1) - spent_before) / c, 0, 1), 1.0)
+    x_sorted = np.where(np.take_along_axis(gain, ratio_order, axis=-1) > 0, x_sorted, 0.0)
+    x = np.empty_like(x_sorted)
+    np.put_along_axis(x, ratio_order, x_sorted, axis=-1)
+    return x
+
+def _ratio_order(gain, cost):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(cost > 0, gain / cost, np.inf)
+    return np.argsort(-ratio, axis=-1, kind="stable")
+
+def _subsets(n):
+    return np.array(list(product((0, 1), repeat=n)), dtype=float)
+
+def optimize_plants(breakdown: Mapping, production_tpy, budget, actions: Mapping = DEFAULT_ACTIONS, discrete: bool = False) -> Dict:
+    # Best portfolio per plant under its own budget (scalar or per-plant array).
+    # Continuous intensities are an LP solved exactly by abatement-per-cost order; discrete mode scores all
+    # 2^actions on/off subsets for every plant at once and keeps the best affordable one.
+    gain, cost = action_matrices(breakdown, production_tpy, actions)
+    budget = np.broadcast_to(np.asarray(budget, dtype=float), gain.shape[:1])
+    if discrete:
+        S = _subsets(gain.shape[1])
+        g, c = gain @ S.T, cost @ S.T
+        score = np.where(c <= budget[:, None] * (1 + 1e-12), g - 1e-9 * c, -np.inf)
+        x = S[np.argmax(score, axis=1)]
+    else:
+        x = _fill(_ratio_order(gain, cost), gain, cost, budget)
+    return _result(actions, x, gain, cost, breakdown)
+
+def optimize_fleet(breakdown: Mapping, production_tpy, budget: float, actions: Mapping = DEFAULT_ACTIONS,
+                   discrete: bool = False, iterations: int = 60) -> Dict:
+    # Best portfolio across all plants under one shared budget.
+    # Continuous: exact LP via a single fleet-wide fractional knapsack. Discrete: Lagrangian relaxation; each plant
+    # maximizes abatement - lam * cost over its subsets and lam is bisected until spending fits the budget.
+    gain, cost = action_matrices(breakdown, production_tpy, actions)
+    if not discrete:
+        flat_g, flat_c = gain.ravel(), cost.ravel()
+        x = _fill(_ratio_order(flat_g, flat_c), flat_g, flat_c, np.asarray(float(budget))).reshape(gain.shape)
+        return _result(actions, x, gain, cost, breakdown)
+    S = _subsets(gain.shape[1])
+    g, c = gain @ S.T, cost @ S.T
+
+    def pick(lam):
+        return np.argmax(g - lam * c - 1e-9 * c, axis=1)
+
+    rows = np.arange(len(g))
+    lo, hi = 0.0, 1.0
+    while c[rows, pick(hi)].sum() > budget and hi < 1e12:
+        hi *= 2
+    for _ in range(iterations):
+        mid = (lo + hi) / 2
+        if c[rows, pick(mid)].sum() > budget:
+            lo = mid
+        else:
+            hi = mid
+    return _result(actions, S[pick(hi)], gain, cost, breakdown)
@@ -1,37 +1,118 @@
-
-from fpdf import FPDF
+import hashlib
+import os
 from datetime import datetime
 from io import BytesIO
-from PIL import Image
-from .i18n import LANGS
-def export_pdf(filename_base, baseline, post_total, reduction, selected_actions, logo_image, fig1, fig2, lang_code):
-    buf1 = BytesIO(); fig1.write_image(buf1, format="png", scale=2); buf1.seek(0)
-    buf2 = BytesIO(); fig2.write_image(buf2, format="png", scale=2); buf2.seek(0)
-    ts = datetime.now().strftime("%Y-%m-%d_%H-%M")
-    filename = f"{filename_base}_{ts}.pdf"
-    img1 = Image.open(buf1); img1_path = "before_after.png"; img1.save(img1_path)
-    img2 = Image.open(buf2); img2_path = "breakdown.png"; img2.save(img2_path)
-    T = LANGS[lang_code]
+from .cache import memoize
+from .i18n import catalog, pdf_catalog, pdf_text
+from .instrument import span
+
+def has_browser() -> bool:
+    # kaleido >= 1.0 drives an installed Chrome; False when it cannot find one (older kaleido bundles its own).
+    try:
+        from choreographer.browsers.chromium import Chromium
+    except ImportError:
+        return True
+    return Chromium.find_browser(skip_local=False) is not None
+
+def warm_renderer():
+    # Start kaleido's persistent browser once so later renders skip the cold start (kaleido >= 1.0;
+    # older kaleido keeps its own long-lived subprocess already).
+    try:
+        import kaleido
+    except ImportError:
+        return
+    # Without a browser the server thread dies at once yet still counts as running, and every later render
+    # would wait on it forever. Only start it when Chrome can be found; otherwise plotly renders one-shot and
+    # raises its usual "requires Chrome" error.
+    if hasattr(kaleido, "start_sync_server") and has_browser():
+        kaleido.start_sync_server(silence_warnings=True)
+
+def _fig_digest(fig, scale=2):
+    return hashlib.sha1(fig.to_json().encode()).hexdigest(), scale
+
+# PNG bytes keyed on the figure's content, so repeat exports of an unchanged chart skip kaleido.
+@memoize(32, key=_fig_digest)
+def render_png(fig, scale=2):
+    with span("kaleido.render_png"):
+        return fig.to_image(format="png", scale=scale)
+
+def build_pdf(baseline, post_total, reduction, selected_actions, logo_image, png1, png2, lang_code, ts=None) -> bytes:
+    # png1/png2: PNG bytes of the before/after and breakdown charts; logo_image: path, file-like or None.
+    with span("pdf.build"):
+        return _build_pdf(baseline, post_total, reduction, selected_actions, logo_image, png1, png2, lang_code, ts)
+
+def _build_pdf(baseline, post_total, reduction, selected_actions, logo_image, png1, png2, lang_code, ts):
+    from fpdf import FPDF
+    ts = ts or datetime.now().strftime("%Y-%m-%d_%H-%M")
+    P = pdf_catalog(lang_code)  # latin-1 strings, precomputed per language
+    line = dict(new_x="LMARGIN", new_y="NEXT")
     pdf = FPDF(); pdf.add_page()
     if logo_image is not None: pdf.image(logo_image, x=160, y=8, w=40)
-    pdf.set_font("Arial", "B", 16); pdf.cell(0, 10, T["title"].encode('latin-1','ignore').decode('latin-1'), ln=True, align="C")
-    pdf.set_font("Arial", "", 11); pdf.cell(0, 8, f"{T['pdf_generated']}: {ts.replace('_', ' ')}", ln=True); pdf.ln(4)
-    pdf.set_font("Arial", "", 12)
-    pdf.cell(0, 8, f"{T['pdf_baseline']}: {baseline['Total CO2 (tons)']:.1f} t/yr", ln=True)
-    pdf.cell(0, 8, f"{T['pdf_post']}: {post_total:.1f} t/yr", ln=True)
-    pdf.cell(0, 8, f"{T['pdf_reduction']}: {reduction:.1f} t/yr", ln=True)
+    pdf.set_font("Helvetica", "B", 16); pdf.cell(0, 10, P["title"], align="C", **line)
+    pdf.set_font("Helvetica", "", 11); pdf.cell(0, 8, f"{P['pdf_generated']}: {ts.replace('_', ' ')}", **line); pdf.ln(4)
+    pdf.set_font("Helvetica", "", 12)
+    pdf.cell(0, 8, f"{P['pdf_baseline']}: {baseline['Total CO2 (tons)']:.1f} t/yr", **line)
+    pdf.cell(0, 8, f"{P['pdf_post']}: {post_total:.1f} t/yr", **line)
+    pdf.cell(0, 8, f"{P['pdf_reduction']}: {reduction:.1f} t/yr", **line)
     pdf.ln(4)
-    pdf.set_font("Arial", "B", 12); pdf.cell(0, 8, f"{T['pdf_selected_actions']}:", ln=True)
-    pdf.set_font("Arial", "", 12)
+    pdf.set_font("Helvetica", "B", 12); pdf.cell(0, 8, f"{P['pdf_selected_actions']}:", **line)
+    pdf.set_font("Helvetica", "", 12)
     if selected_actions:
         for i, a in enumerate(selected_actions, 1):
-            pdf.cell(0, 8, f"{i}. {a.encode('latin-1','ignore').decode('latin-1')}", ln=True)
+            pdf.cell(0, 8, f"{i}. {pdf_text(lang_code, a)}", **line)
     else:
-        pdf.cell(0, 8, "None", ln=True)
+        pdf.cell(0, 8, "None", **line)
     pdf.ln(6)
-    pdf.set_font("Arial", "B", 12); pdf.cell(0, 8, f"{T['pdf_before_after']}:", ln=True)
-    pdf.image(img1_path, x=10, y=None, w=180); pdf.ln(2)
-    pdf.set_font("Arial", "B", 12); pdf.cell(0, 8, f"{T['pdf_baseline_breakdown']}:", ln=True)
-    pdf.image(img2_path, x=10, y=None, w=180)
-    pdf.output(filename)
+    pdf.set_font("Helvetica", "B", 12); pdf.cell(0, 8, f"{P['pdf_before_after']}:", **line)
+    pdf.image(BytesIO(png1), x=10, y=None, w=180); pdf.ln(2)
+    pdf.set_font("Helvetica", "B", 12); pdf.cell(0, 8, f"{P['pdf_baseline_breakdown']}:", **line)
+    pdf.image(BytesIO(png2), x=10, y=None, w=180)
+    return bytes(pdf.output())
+
+def export_pdf_bytes(filename_base, baseline, post_total, reduction, selected_actions, logo_image, fig1, fig2, lang_code):
+    # In-memory export: returns (suggested filename, PDF bytes); nothing is written to disk.
+    ts = datetime.now().strftime("%Y-%m-%d_%H-%M")
+    pdf = build_pdf(baseline, post_total, reduction, selected_actions, logo_image, render_png(fig1), render_png(fig2), lang_code, ts)
+    return f"{filename_base}_{ts}.pdf", pdf
+
+def export_pdf(filename_base, baseline, post_total, reduction, selected_actions, logo_image, fig1, fig2, lang_code):
+    filename, pdf = export_pdf_bytes(filename_base, baseline, post_total, reduction, selected_actions, logo_image, fig1, fig2, lang_code)
+    with open(filename, "wb") as f:
+        f.write(pdf)
     return filename
+
+def report_pdf(baseline, post_total, reduction, selected_actions, logo_bytes, lang_code, ts=None) -> bytes:
+    # Builds the standard charts and the report in one call; used by bulk export and the server workers.
+    from .charts import fig_before_after, fig_breakdown
+    png1 = render_png(fig_before_after(baseline["Total CO2 (tons)"], post_total))
+    png2 = render_png(fig_breakdown(baseline["Breakdown"], catalog(lang_code)["breakdown"]))
+    logo = BytesIO(logo_bytes) if logo_bytes else None
+    return build_pdf(baseline, post_total, reduction, selected_actions, logo, png1, png2, lang_code, ts)
+
+def _plant_report(job):
+    name, baseline, post_total, reduction, selected_actions, logo_bytes, lang_code, path = job
+    # Render before opening the file so a failed render leaves no empty PDF behind.
+    pdf = report_pdf(baseline, post_total, reduction, selected_actions, logo_bytes, lang_code)
+    with open(path, "wb") as f:
+        f.write(pdf)
+    return path
+
+def export_bulk(reports, out_dir, lang_code="en", logo_bytes=None, processes=None):
+    # reports: iterable of (plant name, baseline dict, post_total, reduction, selected action labels).
+    # Each worker process keeps one warm kaleido renderer for all the plants it handles.
+    from concurrent.futures import ProcessPoolExecutor
+    os.makedirs(out_dir, exist_ok=True)
+    jobs, used = [], set()
+    for i, (name, baseline, post_total, reduction, selected_actions) in enumerate(reports):
+        # Names that had to be sanitized get a short hash of the original, and repeats the row number, so two
+        # plants never share a file (e.g. "Plant A" vs "Plant_A", or one plant listed twice).
+        safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in str(name))
+        if safe != str(name):
+            safe += "_" + hashlib.sha1(str(name).encode()).hexdigest()[:6]
+        while safe.lower() in used:
+            safe += f"_{i}"
+        used.add(safe.lower())
+        jobs.append((name, baseline, float(post_total), float(reduction), list(selected_actions), logo_bytes, lang_code,
+                     os.path.join(out_dir, f"CO2_Summary_{safe}.pdf")))
+    with ProcessPoolExecutor(max_workers=processes, initializer=warm_renderer) as pool:
+        return list(pool.map(_plant_report, jobs, chunksize=max(1, len(jobs) // (4 * (processes or os.cpu_count() or 1)))))
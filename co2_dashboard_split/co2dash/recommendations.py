@@ -1,11 +1,173 @@
+import math
+import operator
+from typing import Dict, List, Mapping
+import numpy as np
+from .cache import memoize
+from .emissions import BREAKDOWN_KEYS
 
-def make_recommendations(breakdown: dict):
-    parts = sorted(breakdown.items(), key=lambda x: x[1], reverse=True)
-    tips = []
-    if parts and parts[0][0].startswith("Electricity"):
-        tips.append("High electricity emissions → prioritize on-site solar/PPA and efficiency.")
-    if parts and parts[0][0].startswith("Coal"):
-        tips.append("Coal dominates → fuel switch, heat recovery, and combustion optimization.")
-    if parts and parts[0][0].startswith("Steel-making"):
-        tips.append("Process heavy → increase scrap charge and explore alternative feedstocks.")
-    return tips
+TIPS = {
+    "Electricity": "High electricity emissions → prioritize on-site solar/PPA and efficiency.",
+    "Coal": "Coal dominates → fuel switch, heat recovery, and combustion optimization.",
+    "Steel-making": "Process heavy → increase scrap charge and explore alternative feedstocks.",
+}
+
+# Short feature names for the Breakdown sources, in BREAKDOWN_KEYS order.
+SOURCES = ("coal", "electricity", "process")
+
+# Declarative rules. A rule fires when every (feature, op, value) in "when" holds; a missing feature fails its
+# conditions. Fired rules are ranked per plant by "priority" (lower first), then by the t CO2/yr named in "rank"
+# (the emissions the tip acts on). "focus" is the (driver, direction) row for the dashboard's focus table.
+# Features: coal/electricity/process/total (t CO2/yr), <source>_share (of total), dominant (a SOURCES name),
+# intensity (t CO2 per t steel, needs annual production), grid_factor (tCO2/kWh, or from region), scrap (%).
+RULES = {
+    "electricity_dominant": {"when": [("dominant", "==", "electricity")], "tip": TIPS["Electricity"],
+                             "focus": ("elec", "down"), "rank": "electricity", "priority": 0},
+    "coal_dominant": {"when": [("dominant", "==", "coal")], "tip": TIPS["Coal"],
+                      "focus": ("coal", "down"), "rank": "coal", "priority": 0},
+    "process_dominant": {"when": [("dominant", "==", "process")], "tip": TIPS["Steel-making"],
+                         "focus": ("process", "down"), "rank": "process", "priority": 0},
+    "dirty_grid": {"when": [("grid_factor", ">=", 0.0005), ("electricity_share", ">=", 0.15)],
+                   "tip": "Carbon-heavy grid → a renewable PPA or rooftop solar cuts more here than elsewhere.",
+                   "focus": ("elec", "down"), "rank": "electricity"},
+    "large_coal": {"when": [("coal", ">=", 5000)],
+                   "tip": "Over 5,000 t CO₂/yr from coal → size a waste-heat recovery or burner upgrade project.",
+                   "focus": ("coal", "down"), "rank": "coal"},
+    "low_scrap": {"when": [("scrap", "<", 20), ("process_share", ">=", 0.3)],
+                  "tip": "Scrap below 20% of the charge → raise it where product quality allows.",
+                  "focus": ("scrap", "up"), "rank": "process"},
+    "high_intensity": {"when": [("intensity", ">=", 2.2)],
+                       "tip": "Above 2.2 t CO₂ per t steel → benchmark against peers and plan an energy audit.",
+                       "rank": "total"},
+}
+
+_OPS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge, "==": operator.eq, "!=": operator.ne}
+# Categorical features are stored as float codes so every feature is one float array.
+_CODES = {"dominant": {s: float(i) for i, s in enumerate(SOURCES)}}
+
+def features(frame, production=None, scrap=None, grid_factor=None) -> Dict[str, np.ndarray]:
+    # frame: DataFrame or mapping with one column per Breakdown label, plus optional production (annual t steel),
+    # scrap, grid_factor or region columns; the keyword arguments stand in for columns that are missing.
+    def col(name, default=None):
+        v = frame[name] if name in frame else default
+        return None if v is None else np.atleast_1d(np.asarray(v, dtype=float))
+
+    src = np.stack(np.broadcast_arrays(*[col(k, 0.0) for k in BREAKDOWN_KEYS]), axis=-1)
+    n, total = src.shape[0], src.sum(axis=-1)
+    feats = {s: src[:, i] for i, s in enumerate(SOURCES)}
+    feats["total"] = total
+    prod, gf = col("production", production), col("grid_factor", grid_factor)
+    if gf is None and "region" in frame:
+        from .regions import grid_factors
+        gf = grid_factors(frame["region"], np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for i, s in enumerate(SOURCES):
+            feats[f"{s}_share"] = np.where(total > 0, src[:, i] / total, np.nan)
+        feats["dominant"] = np.where(total > 0, src.argmax(axis=-1), np.nan)
+        feats["intensity"] = None if prod is None else np.where(prod > 0, total / prod, np.nan)
+    feats["grid_factor"], feats["scrap"] = gf, col("scrap", scrap)
+    return {k: np.full(n, np.nan) if v is None else np.broadcast_to(v, (n,)) for k, v in feats.items()}
+
+FEATURES = SOURCES + ("total",) + tuple(f"{s}_share" for s in SOURCES) + ("dominant", "intensity", "grid_factor", "scrap")
+
+def _checks(conditions):
+    return tuple((feature, _OPS[op], _CODES.get(feature, {}).get(value, value)) for feature, op, value in conditions)
+
+def _predicate(conditions):
+    checks = _checks(conditions)
+
+    def pred(feats):
+        fired = True
+        for feature, fn, value in checks:
+            x = feats[feature]
+            fired = fired & fn(x, value) & ~np.isnan(x)
+        return fired
+    return pred
+
+@memoize(8)
+def compile_rules(rules: Mapping = RULES):
+    # Turns the rule table into predicates over feature arrays; cached, so the parsing happens once per table.
+    for rid, r in rules.items():
+        for feature, op, _ in r["when"]:
+            if feature not in FEATURES or op not in _OPS:
+                raise ValueError(f"rule {rid}: unknown feature or operator in {(feature, op)!r}")
+    return {"ids": tuple(rules), "tips": np.array([r["tip"] for r in rules.values()], dtype=object),
+            "focus": tuple(r.get("focus") for r in rules.values()),
+            "priority": np.array([r.get("priority", 1) for r in rules.values()], dtype=float),
+            "rank": tuple(r.get("rank", "total") for r in rules.values()),
+            "checks": tuple(_checks(r["when"]) for r in rules.values()),
+            "predicates": tuple(_predicate(r["when"]) for r in rules.values())}
+
+# The default table compiled once at import: looking it up in compile_rules' cache means freezing the whole
+# table into a key on every call. Edit RULES before import, or pass a modified copy as rules=.
+_DEFAULT = compile_rules(RULES)
+
+def _compiled(rules):
+    return _DEFAULT if rules is RULES else compile_rules(rules)
+
+def evaluate(frame, rules: Mapping = RULES, top: int = 3, **context) -> Dict:
+    # Fires every rule for every plant at once (one vectorized pass per rule, no per-plant loop) and ranks them.
+    # Returns rules (ids, column order), fired and score (plants, rules), and order/tips (plants, top): rule
+    # indices and tip texts best first, -1 / "" where fewer rules fired. context: see features().
+    c = _compiled(rules)
+    feats = features(frame, **context)
+    n, r = len(feats["total"]), len(c["ids"])
+    fired = np.zeros((n, r), dtype=bool)
+    score = np.zeros((n, r))
+    for j, (pred, rank) in enumerate(zip(c["predicates"], c["rank"])):
+        fired[:, j] = pred(feats)
+        score[:, j] = feats[rank]
+    # lexsort: last key is primary -> fired first, then priority, then larger score.
+    order = np.lexsort((-np.nan_to_num(score), np.broadcast_to(c["priority"], (n, r)), ~fired), axis=-1)[:, :top]
+    hit = np.take_along_axis(fired, order, axis=-1)
+    order = np.where(hit, order, -1)
+    tips = np.where(hit, c["tips"][order], "")
+    return {"rules": c["ids"], "fired": fired, "score": score, "order": order, "tips": tips}
+
+def _scalar_features(breakdown, production, scrap, grid_factor) -> Dict[str, float]:
+    # features() for one plant given as plain numbers; numpy's per-call overhead dominates at that size.
+    nan = math.nan
+    src = [float(breakdown.get(k, 0.0)) for k in BREAKDOWN_KEYS]
+    total = sum(src)
+    feats = dict(zip(SOURCES, src), total=total)
+    for s, v in zip(SOURCES, src):
+        feats[f"{s}_share"] = v / total if total > 0 else nan
+    feats["dominant"] = float(src.index(max(src))) if total > 0 else nan
+    feats["intensity"] = total / production if production is not None and production > 0 else nan
+    feats["grid_factor"] = nan if grid_factor is None else float(grid_factor)
+    feats["scrap"] = nan if scrap is None else float(scrap)
+    return feats
+
+def _scalar_order(c, feats) -> List[int]:
+    # Same ranking as evaluate(): fired rules by priority, then larger score (NaN as 0), then table order.
+    fired = []
+    for j, checks in enumerate(c["checks"]):
+        for f, fn, v in checks:
+            x = feats[f]
+            if x != x or not fn(x, v):
+                break
+        else:
+            fired.append(j)
+    if len(fired) < 2:
+        return fired
+    rank, priority = c["rank"], c["priority"]
+    score = {j: feats[rank[j]] if feats[rank[j]] == feats[rank[j]] else 0.0 for j in fired}
+    return sorted(fired, key=lambda j: (priority[j], -score[j]))
+
+def recommend(breakdown: Mapping, production=None, scrap=None, grid_factor=None, rules: Mapping = RULES) -> List[Dict]:
+    # Ranked fired rules for one plant as [{"id", "tip", "focus"}, ...].
+    c = _compiled(rules)
+    context = (production, scrap, grid_factor)
+    if isinstance(breakdown, Mapping) and all(isinstance(v, (int, float)) for v in (*breakdown.values(), *context) if v is not None):
+        order = _scalar_order(c, _scalar_features(breakdown, *context))
+    else:
+        order = evaluate(breakdown, rules, top=len(rules), production=production, scrap=scrap, grid_factor=grid_factor)["order"][0]
+    return [{"id": c["ids"][j], "tip": c["tips"][j], "focus": c["focus"][j]} for j in order if j >= 0]
+
+def make_recommendations(breakdown: dict, **context):
+    return [r["tip"] for r in recommend(breakdown, **context)]
+
+def dominant_tips(breakdown_frame):
+    # breakdown_frame: DataFrame with one column per Breakdown label; returns the dominant-source tip per row.
+    import pandas as pd
+    rules = {k: v for k, v in RULES.items() if v.get("priority") == 0}
+    return pd.Series(evaluate(breakdown_frame, rules, top=1)["tips"][:, 0], index=breakdown_frame.index)
@@ -1,3 +1,7 @@
+import json
+import os
+import numpy as np
+
 
 REGIONAL_GRID = {
     "India": 0.00071,
@@ -6,3 +10,74 @@ REGIONAL_GRID = {
     "China": 0.00058,
     "Brazil": 0.00010
 }
+
+def grid_factors(regions, default: float, region_grid: dict = None):
+    # Per-row electricity factor for a pandas Series of region names; unknown regions fall back to default.
+    return regions.map(REGIONAL_GRID if region_grid is None else region_grid).fillna(default).to_numpy(dtype=float)
+
+
+# Hour-of-year (non-leap, 8,760 h) -> month index 0..11, for scoring hourly loads against monthly tables.
+_DAYS = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+HOUR_TO_MONTH = np.repeat(np.arange(12), np.array(_DAYS) * 24)
+
+def load_grid_table(path, mmap: bool = True) -> dict:
+    # Time-varying grid intensity (tCO2/kWh) as {"regions": [...], "factors": (regions, periods) array}.
+    # .npy files are memory-mapped and need a .json sidecar listing the regions in row order;
+    # .parquet/.csv files are long tables with region, period (0-based hour or month) and factor columns.
+    path = str(path)
+    if path.endswith(".npy"):
+        with open(os.path.splitext(path)[0] + ".json") as f:
+            meta = json.load(f)
+        factors = np.load(path, mmap_mode="r" if mmap else None)
+        return {"regions": list(meta["regions"]), "factors": factors}
+    import pandas as pd
+    df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+    wide = df.pivot(index="region", columns="period", values="factor").sort_index(axis=1)
+    # Every region needs a factor for every period 0..n-1, or plants there would silently score NaN.
+    periods = wide.columns.to_numpy()
+    if not np.array_equal(periods, np.arange(len(periods))):
+        raise ValueError(f"{path}: periods must be 0..{len(periods) - 1} with none missing")
+    gaps = {r: list(wide.columns[row]) for r, row in zip(wide.index, wide.isna().to_numpy()) if row.any()}
+    if gaps:
+        detail = "; ".join(f"{r}: {p[:10]}{' ...' if len(p) > 10 else ''}" for r, p in gaps.items())
+        raise ValueError(f"{path}: missing factors for periods by region ({detail})")
+    return {"regions": list(wide.index), "factors": np.ascontiguousarray(wide.to_numpy(dtype=np.float32))}
+
+def save_grid_table(table: dict, path):
+    # Writes the compact .npy + .json form that load_grid_table memory-maps.
+    path = str(path)
+    np.save(path, np.asarray(table["factors"], dtype=np.float32))
+    with open(os.path.splitext(path)[0] + ".json", "w") as f:
+        json.dump({"regions": list(table["regions"])}, f)
+
+def timed_electricity_emissions(load_kwh, regions, table: dict, default=None, chunk: int = 512) -> np.ndarray:
+    # load_kwh: (plants, periods) kWh profile; regions: region name per plant. Returns tCO2 per plant.
+    # Monthly tables are expanded to hourly when the profile has 8,760 columns. Plants in regions missing
+    # from the table use the flat annual factor (default, else REGIONAL_GRID); a region found in neither is an error.
+    load_kwh = np.asarray(load_kwh)
+    factors = table["factors"]
+    if factors.shape[1] == 12 and load_kwh.shape[1] == len(HOUR_TO_MONTH):
+        factors = np.asarray(factors)[:, HOUR_TO_MONTH]
+    if factors.shape[1] != load_kwh.shape[1]:
+        raise ValueError(f"load profile has {load_kwh.shape[1]} periods, grid table has {factors.shape[1]}")
+    pos = {r: i for i, r in enumerate(table["regions"])}
+    idx = np.array([pos.get(r, -1) for r in regions])
+    flat = np.array([REGIONAL_GRID.get(r, np.nan) if default is None else default for r in regions], dtype=float)
+    unknown = sorted({str(r) for r, i, f in zip(regions, idx, flat) if i < 0 and np.isnan(f)})
+    if unknown:
+        raise ValueError(f"no grid factor for regions {unknown}: add them to the table or pass default=")
+    out = np.empty(len(load_kwh))
+    # Gather + row-wise dot in plant chunks to bound the temporary (chunk x periods) factor block.
+    for lo in range(0, len(load_kwh), chunk):
+        sl = slice(lo, lo + chunk)
+        i = idx[sl]
+        f = factors[np.maximum(i, 0)]
+        out[sl] = np.einsum("ij,ij->i", load_kwh[sl], f, dtype=float)
+        missing = i < 0
+        if missing.any():
+            out[sl][missing] = load_kwh[sl][missing].sum(axis=1) * flat[sl][missing]
+    # NaN factors (e.g. a hand-built or .npy table with gaps) would otherwise pass through silently.
+    if np.isnan(out).any():
+        bad = sorted({str(r) for r, v in zip(regions, out) if np.isnan(v)})
+        raise ValueError(f"NaN electricity emissions for plants in regions {bad}: check the grid table and load profile")
+    return out
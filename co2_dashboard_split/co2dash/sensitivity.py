@@ -0,0 +1,68 @@
+from typing import Dict, Mapping, Sequence
+import numpy as np
+from .emissions import calculate_emissions_batch
+
+# Activity drivers are changed in % of the base value, except scrap which moves in percentage points (as in the UI sliders).
+DRIVERS = ("production", "coal", "electricity", "scrap")
+FACTORS = ("coal_factor", "electricity_factor", "process_factor")
+PERCENTILES = (5, 25, 50, 75, 95)
+
+def _scenario(base: Mapping, factors: Mapping, changes: Mapping):
+    inputs = {k: np.asarray(base[k], dtype=float) for k in DRIVERS}
+    f = {k: np.asarray(factors[k], dtype=float) for k in FACTORS}
+    for name, delta in changes.items():
+        delta = np.asarray(delta, dtype=float)
+        if name == "scrap":
+            inputs["scrap"] = np.clip(inputs["scrap"] + delta, 0, 100)
+        elif name in inputs:
+            inputs[name] = inputs[name] * (1 + delta/100)
+        elif name in f:
+            f[name] = f[name] * (1 + delta/100)
+        else:
+            raise KeyError(f"unknown sensitivity variable: {name}")
+    return calculate_emissions_batch(inputs["production"], inputs["coal"], inputs["electricity"], inputs["scrap"], f)
+
+def sweep_grid(base: Mapping, factors: Mapping, axes: Mapping[str, Sequence[float]]) -> np.ndarray:
+    # Total CO2 over the full grid of axes (name -> changes); result has one dimension per axis, in axes order.
+    n = len(axes)
+    changes = {}
+    for i, (name, vals) in enumerate(axes.items()):
+        shape = [1] * n
+        shape[i] = -1
+        changes[name] = np.asarray(vals, dtype=float).reshape(shape)
+    total = _scenario(base, factors, changes)["Total CO2 (tons)"]
+    return np.broadcast_to(total, tuple(len(v) for v in axes.values()))
+
+def sample_factors(factors: Mapping, uncertainty: Mapping[str, float], n: int = 100_000, seed=None) -> Dict[str, np.ndarray]:
+    # Normal draws with relative standard deviation uncertainty[name] (e.g. 0.1 = ±10%), truncated at zero.
+    rng = np.random.default_rng(seed)
+    out = {}
+    for k in FACTORS:
+        sd = uncertainty.get(k, 0.0)
+        out[k] = np.maximum(factors[k] * (1 + sd * rng.standard_normal(n)), 0.0) if sd else np.full(n, float(factors[k]))
+    return out
+
+def monte_carlo(base: Mapping, factors: Mapping, uncertainty: Mapping[str, float], n: int = 100_000, seed=None,
+                percentiles: Sequence[float] = PERCENTILES) -> Dict[float, float]:
+    samples = sample_factors(factors, uncertainty, n, seed)
+    total = _scenario(base, samples, {})["Total CO2 (tons)"]
+    return {q: float(v) for q, v in zip(percentiles, np.percentile(total, percentiles))}
+
+def monte_carlo_bands(base: Mapping, factors: Mapping, uncertainty: Mapping[str, float], axis: str, sweep: Sequence[float],
+                      n: int = 100_000, seed=None, percentiles: Sequence[float] = PERCENTILES) -> Dict[float, np.ndarray]:
+    # Percentile bands of total CO2 at each point of a one-variable sweep under factor uncertainty.
+    samples = {k: v[:, None] for k, v in sample_factors(factors, uncertainty, n, seed).items()}
+    total = _scenario(base, samples, {axis: np.asarray(sweep, dtype=float)[None, :]})["Total CO2 (tons)"]
+    bands = np.percentile(total, percentiles, axis=0)
+    return dict(zip(percentiles, bands))
+
+def tornado(base: Mapping, factors: Mapping, swing: float = 10.0, variables: Sequence[str] = DRIVERS + FACTORS):
+    # Rank variables by the total-CO2 range from -swing% to +swing%; returns [(name, low, high)] largest range first.
+    # Every variable moves by the same relative amount, scrap included (converted to points of its base value),
+    # so the ranking is not skewed by scrap's percentage-point units.
+    def delta(v, sign):
+        return sign * swing * (float(base["scrap"]) / 100 if v == "scrap" else 1)
+    low = np.array([_scenario(base, factors, {v: delta(v, -1)})["Total CO2 (tons)"] for v in variables])
+    high = np.array([_scenario(base, factors, {v: delta(v, 1)})["Total CO2 (tons)"] for v in variables])
+    order = np.argsort(-np.abs(high - low), kind="stable")
+    return [(variables[i], float(low[i]), float(high[i])) for i in order]
@@ -0,0 +1,148 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from .emissions import calculate_emissions, apply_interventions
+from . import instrument
+
+# Small JSON-over-HTTP service so many dashboard sessions can share one box:
+#   POST /emissions  {"production", "coal", "electricity", "scrap", "factors", "flags"}  -> baseline + post totals
+#   POST /chart      {"kind": "before_after" | "breakdown", "args": [...], "scale": 2}   -> image/png
+#   POST /pdf        {"baseline", "post_total", "reduction", "selected_actions", "lang_code", "logo_b64"} -> application/pdf
+#   GET  /health
+#   GET  /metrics    Prometheus text (request timings need CO2DASH_PROFILE=1)
+# PNG and PDF rendering runs in a process pool with one warm kaleido renderer per worker; identical requests that
+# arrive while one is still running share its result instead of rendering again.
+DEFAULT_PORT = 8765
+MAX_BODY = 16 * 1024 * 1024
+
+def _emissions(payload):
+    baseline = calculate_emissions(payload["production"], payload["coal"], payload["electricity"], payload["scrap"], payload["factors"])
+    post_total, reduction = apply_interventions(baseline["Total CO2 (tons)"], payload.get("flags", {}))
+    return "application/json", json.dumps(dict(baseline, post_total=post_total, reduction=reduction)).encode()
+
+def _chart(payload):
+    from .charts import fig_before_after, fig_breakdown
+    from .pdf_export import render_png
+    builders = {"before_after": fig_before_after, "breakdown": fig_breakdown}
+    fig = builders[payload["kind"]](*payload["args"])
+    return "image/png", render_png(fig, payload.get("scale", 2))
+
+def _pdf(payload):
+    from .pdf_export import report_pdf
+    logo = base64.b64decode(payload["logo_b64"]) if payload.get("logo_b64") else None
+    pdf = report_pdf(payload["baseline"], payload["post_total"], payload["reduction"], payload.get("selected_actions", []),
+                     logo, payload.get("lang_code", "en"), payload.get("ts"))
+    return "application/pdf", pdf
+
+# path -> (handler, run in process pool)
+ROUTES = {"/emissions": (_emissions, False), "/chart": (_chart, True), "/pdf": (_pdf, True)}
+
+def _worker_init():
+    from .pdf_export import warm_renderer
+    warm_renderer()
+
+class Service:
+    def __init__(self, workers=None):
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_worker_init)
+        self.inflight = {}
+        self.stats = {"requests": 0, "deduplicated": 0, "errors": 0}
+
+    async def call(self, path, payload):
+        handler, offload = ROUTES[path]
+        if not offload:
+            return handler(payload)
+        if path == "/pdf" and not payload.get("ts"):
+            # Pin the timestamp so identical concurrent reports are byte-identical and can share one render.
+            payload = dict(payload, ts=datetime.now().strftime("%Y-%m-%d_%H-%M"))
+        key = hashlib.sha1((path + json.dumps(payload, sort_keys=True)).encode()).hexdigest()
+        fut = self.inflight.get(key)
+        if fut is not None:
+            self.stats["deduplicated"] += 1
+            return await asyncio.shield(fut)
+        loop = asyncio.get_running_loop()
+        fut = asyncio.ensure_future(loop.run_in_executor(self.pool, handler, payload))
+        self.inflight[key] = fut
+        try:
+            return await asyncio.shield(fut)
+        finally:
+            if fut.done():
+                self.inflight.pop(key, None)
+            else:
+                fut.add_done_callback(lambda _: self.inflight.pop(key, None))
+
+    async def handle(self, reader, writer):
+        status, ctype, body = 200, "application/json", b""
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1")
+                if line in ("\r\n", "\n", ""):
+                    break
+                k, _, v = line.partition(":")
+                headers[k.strip().lower()] = v.strip()
+            method, path = request_line[0], request_line[1].split("?")[0]
+            self.stats["requests"] += 1
+            if method == "GET" and path == "/health":
+                body = json.dumps(dict(self.stats, inflight=len(self.inflight))).encode()
+            elif method == "GET" and path == "/metrics":
+                ctype = "text/plain; version=0.0.4"
+                body = (instrument.prometheus_text() + "".join(
+                    f"# TYPE co2dash_server_{k}_total counter\nco2dash_server_{k}_total {v}\n" for k, v in self.stats.items())).encode()
+            elif method == "POST" and path in ROUTES:
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY:
+                    raise ValueError("request body too large")
+                payload = json.loads(await reader.readexactly(length) or b"{}")
+                with instrument.span(f"server{path}"):
+                    ctype, body = await self.call(path, payload)
+            else:
+                status, body = 404, b'{"error": "not found"}'
+        except Exception as e:
+            self.stats["errors"] += 1
+            status, body = 400 if isinstance(e, (ValueError, KeyError, TypeError, IndexError)) else 500, json.dumps({"error": str(e)}).encode()
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}[status]
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: {ctype}\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode() + body)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+async def serve(host="127.0.0.1", port=DEFAULT_PORT, workers=None):
+    service = Service(workers)
+    server = await asyncio.start_server(service.handle, host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.pool.shutdown(cancel_futures=True)
+
+def post(base_url, path, payload, timeout=120):
+    # Client helper for the dashboard: returns the raw response body.
+    req = urllib.request.Request(base_url.rstrip("/") + path, data=json.dumps(payload).encode(),
+                                 headers={"Content-Type": "application/json"}, method="POST")
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        return resp.read()
+
+def request_pdf(base_url, baseline, post_total, reduction, selected_actions, logo_bytes, lang_code):
+    payload = {"baseline": baseline, "post_total": post_total, "reduction": reduction, "selected_actions": list(selected_actions),
+               "lang_code": lang_code, "logo_b64": base64.b64encode(logo_bytes).decode() if logo_bytes else None}
+    return post(base_url, "/pdf", payload)
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m co2dash.server", description="Shared rendering/computation service for the dashboard.")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p.add_argument("--workers", type=int, default=os.cpu_count(), help="render worker processes")
+    args = p.parse_args(argv)
+    asyncio.run(serve(args.host, args.port, args.workers))
+
+if __name__ == "__main__":
+    main()
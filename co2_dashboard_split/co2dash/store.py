@@ -0,0 +1,115 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+DEFAULT_DB = os.environ.get("CO2DASH_DB", "plants.db")
+COLUMNS = ("name", "region", "period", "baseline", "post")
+
+# Rows belong to an owner (the dashboard uses one per browser session) so users sharing a server only see and
+# clear their own plants; owner=None in the read/clear functions means every owner (fleet jobs, admin).
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS plants (
+    owner TEXT NOT NULL DEFAULT '',
+    name TEXT NOT NULL,
+    region TEXT,
+    period TEXT NOT NULL DEFAULT '',
+    baseline REAL NOT NULL,
+    post REAL NOT NULL,
+    PRIMARY KEY (owner, name, period)
+);
+CREATE INDEX IF NOT EXISTS idx_plants_region ON plants (owner, region, period);
+CREATE INDEX IF NOT EXISTS idx_plants_period ON plants (owner, period);
+"""
+# Databases from before owners existed: move their rows to owner '' under the new key.
+_MIGRATE = """
+ALTER TABLE plants RENAME TO plants_v1;
+DROP INDEX IF EXISTS idx_plants_region;
+DROP INDEX IF EXISTS idx_plants_period;
+""" + _SCHEMA + """
+INSERT INTO plants (name, region, period, baseline, post) SELECT name, region, period, baseline, post FROM plants_v1;
+DROP TABLE plants_v1;
+"""
+
+_ready = set()
+_ready_lock = threading.Lock()
+
+def _init(conn, path):
+    # WAL mode and the schema are per database file, so set them up once per process, not per connection.
+    with _ready_lock:
+        if path in _ready:
+            return
+        conn.execute("PRAGMA journal_mode=WAL")
+        cols = [r[1] for r in conn.execute("PRAGMA table_info(plants)")]
+        conn.executescript(_MIGRATE if cols and "owner" not in cols else _SCHEMA)
+        _ready.add(path)
+
+@contextmanager
+def connect(path: str = DEFAULT_DB):
+    # Short-lived connection per call so it can be used from any Streamlit session thread.
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        _init(conn, path)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+def _where(region: Optional[str], period: Optional[str], owner: Optional[str] = None):
+    clauses, params = [], []
+    if owner is not None:
+        clauses.append("owner = ?"); params.append(owner)
+    if region is not None:
+        clauses.append("region = ?"); params.append(region)
+    if period is not None:
+        clauses.append("period = ?"); params.append(period)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+def upsert_plants(rows: Iterable[Dict], owner: str = "", path: str = DEFAULT_DB) -> int:
+    # Bulk insert or replace rows keyed on (owner, name, period).
+    data = [(owner, r["name"], r.get("region"), r.get("period", ""), float(r["baseline"]), float(r["post"])) for r in rows]
+    with connect(path) as conn:
+        conn.executemany(f"INSERT OR REPLACE INTO plants (owner, {', '.join(COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)", data)
+    return len(data)
+
+def count_plants(region: Optional[str] = None, period: Optional[str] = None, owner: Optional[str] = None,
+                 path: str = DEFAULT_DB) -> int:
+    where, params = _where(region, period, owner)
+    with connect(path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM plants{where}", params).fetchone()[0]
+
+def read_plants(limit: int = 50, offset: int = 0, region: Optional[str] = None, period: Optional[str] = None,
+                owner: Optional[str] = None, path: str = DEFAULT_DB) -> List[Dict]:
+    # One page of plants ordered by name, using the primary-key index.
+    where, params = _where(region, period, owner)
+    with connect(path) as conn:
+        cur = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM plants{where} ORDER BY name, period LIMIT ? OFFSET ?",
+                           params + [int(limit), int(offset)])
+        return [dict(zip(COLUMNS, row)) for row in cur]
+
+def iter_plants(batch_size: int = 10_000, region: Optional[str] = None, period: Optional[str] = None,
+                owner: Optional[str] = None, path: str = DEFAULT_DB) -> Iterator[List[Dict]]:
+    # Batched scan for fleet-wide jobs without loading every row at once.
+    where, params = _where(region, period, owner)
+    with connect(path) as conn:
+        cur = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM plants{where} ORDER BY name, period", params)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield [dict(zip(COLUMNS, row)) for row in rows]
+
+def distinct_values(column: str, owner: Optional[str] = None, path: str = DEFAULT_DB) -> List[str]:
+    if column not in ("region", "period"):
+        raise ValueError(f"not an indexed column: {column}")
+    where, params = _where(None, None, owner)
+    where = (where + " AND " if where else " WHERE ") + f"{column} IS NOT NULL"
+    with connect(path) as conn:
+        return [r[0] for r in conn.execute(f"SELECT DISTINCT {column} FROM plants{where} ORDER BY {column}", params)]
+
+def clear_plants(owner: Optional[str], path: str = DEFAULT_DB):
+    # owner is required so a caller cannot wipe everyone's rows by accident; pass None explicitly for that.
+    where, params = _where(None, None, owner)
+    with connect(path) as conn:
+        conn.execute(f"DELETE FROM plants{where}", params)